@@ -79,6 +79,13 @@ class RSecretaryApp:
             # 初始化调度器
             await self._initialize_scheduler()
             
+            # 预热Notion数据库架构缓存
+            try:
+                from src.storage.notion_client import get_notion_client
+                await get_notion_client().warmup()
+            except Exception as e:
+                logger.warning(f"Notion架构预热失败: {e}")
+            
             logger.info("RSecretary 初始化完成")
             return True
             
@@ -20,10 +20,45 @@ class GeminiConfig(BaseModel):
     max_tokens: int = Field(default=1000, description="最大输出令牌数")
 
 
+def _default_schemas() -> Dict[str, Dict[str, str]]:
+    """应用自有数据库的静态属性架构（属性名 -> Notion属性类型）"""
+    return {
+        "accounting": {
+            "标题": "title",
+            "金额": "number",
+            "分类": "select",
+            "日期": "date",
+            "描述": "rich_text",
+            "类型": "select",
+        },
+        "subscriptions": {
+            "名称": "title",
+            "价格": "number",
+            "计费周期": "select",
+            "下次计费": "date",
+            "分类": "select",
+            "描述": "rich_text",
+            "状态": "select",
+        },
+        "todos": {
+            "标题": "title",
+            "优先级": "select",
+            "状态": "select",
+            "分类": "select",
+            "描述": "rich_text",
+            "截止日期": "date",
+        },
+    }
+
+
 class NotionConfig(BaseModel):
     """Notion配置"""
     token: str = Field(default="", description="Notion集成令牌")
     databases: Dict[str, str] = Field(default_factory=dict, description="数据库ID映射")
+    schemas: Dict[str, Dict[str, str]] = Field(
+        default_factory=_default_schemas,
+        description="数据库属性架构映射（免去运行时retrieve）"
+    )
 
 
 class BotConfig(BaseModel):
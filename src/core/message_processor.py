@@ -4,6 +4,8 @@
 """
 
 import asyncio
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Tuple
 from loguru import logger
@@ -13,6 +15,16 @@ from ..tasks.base_task import TaskFactory
 from .task_dispatcher import TaskDispatcher
 
 
+@dataclass(slots=True)
+class UserContext:
+    """单个用户的对话上下文（slots减少每用户内存开销）"""
+
+    messages: deque = field(default_factory=lambda: deque(maxlen=10))
+    context: str = ""
+    last_task_type: Optional[str] = None
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 class MessageProcessor:
     """
     消息处理器
@@ -64,19 +76,30 @@ class MessageProcessor:
         """
         try:
             logger.info(f"处理来自 {platform} 用户 {user_id} 的消息: {message[:100]}...")
-            
+
+            # 快捷路径：命令和过短消息无需AI分析
+            stripped = message.strip()
+            if stripped.startswith('/'):
+                return await self._handle_slash_command(stripped, user_id, platform)
+            if len(stripped) < 2:
+                return await self._handle_chat(message, None)
+
+            # 每次请求只取一次当前时间，后续统一复用
+            req_now = datetime.now(timezone.utc)
+            local_now = datetime.now()
+
             # 获取对话上下文
             context = self._get_conversation_context(user_id)
-            
+
             # 使用AI分析消息意图
             analysis = await self.gemini_client.analyze_task(message)
             task_type = analysis.get("task_type", "chat")
             confidence = analysis.get("confidence", 0.0)
-            
+
             logger.info(f"AI分析结果: 任务类型={task_type}, 置信度={confidence}")
-            
+
             # 更新对话上下文
-            self._update_conversation_context(user_id, message, analysis)
+            self._update_conversation_context(user_id, message, analysis, now=req_now)
             
             # 根据任务类型处理
             if task_type == "chat" or confidence < 0.6:
@@ -89,15 +112,15 @@ class MessageProcessor:
             
             elif task_type == "query":
                 # 查询处理
-                return await self._handle_query(message, analysis, user_id)
-            
+                return await self._handle_query(message, analysis, user_id, now=local_now)
+
             elif task_type == "delete":
                 # 删除处理
                 return await self._handle_delete(message, analysis, user_id)
-            
+
             elif task_type == "update":
                 # 更新处理
-                return await self._handle_update(message, analysis, user_id)
+                return await self._handle_update(message, analysis, user_id, now=local_now)
             
             else:
                 # 未知类型，回退到聊天
@@ -107,6 +130,56 @@ class MessageProcessor:
             logger.error(f"消息处理失败: {e}")
             return "抱歉，我现在无法处理您的消息，请稍后再试。"
     
+    async def _handle_slash_command(self, command: str, user_id: str, platform: str) -> str:
+        """
+        处理斜杠命令（无需AI分析的快捷路径）
+
+        Args:
+            command: 命令文本（已strip）
+            user_id: 用户ID
+            platform: 平台名称
+
+        Returns:
+            str: 命令处理结果
+        """
+        try:
+            handler = self._SLASH_HANDLERS.get(command.split()[0])
+            if handler is None:
+                return f"❓ 未知命令: {command}\n\n可用命令：/daily_report /subscribe_daily /unsubscribe_daily"
+            return await handler(self, user_id, platform)
+        except Exception as e:
+            logger.error(f"命令处理失败: {e}")
+            return "命令处理过程中出现了问题，请稍后再试。"
+
+    async def _cmd_daily_report(self, user_id: str, platform: str) -> str:
+        """立即生成今日报告"""
+        if not self.scheduler:
+            return "每日报告功能暂时不可用，调度器未初始化"
+        return await self.scheduler.send_manual_daily_report(platform, user_id)
+
+    async def _cmd_subscribe_daily(self, user_id: str, platform: str) -> str:
+        """订阅每日推送"""
+        if not self.scheduler:
+            return "订阅功能暂时不可用，调度器未初始化"
+        if self.scheduler.is_user_subscribed(user_id, platform):
+            return "✅ 您已经订阅了每日推送！输入 /unsubscribe_daily 可取消订阅"
+        self.scheduler.add_daily_push_user(user_id, platform)
+        return "✅ 订阅成功！每天早上 8:00 将自动推送每日报告"
+
+    async def _cmd_unsubscribe_daily(self, user_id: str, platform: str) -> str:
+        """取消每日推送订阅"""
+        if not self.scheduler:
+            return "取消订阅功能暂时不可用，调度器未初始化"
+        self.scheduler.remove_daily_push_user(user_id, platform)
+        return "✅ 取消成功！如需重新订阅，请输入 /subscribe_daily"
+
+    # 斜杠命令分发表（命令 -> 处理方法）
+    _SLASH_HANDLERS = {
+        "/daily_report": _cmd_daily_report,
+        "/subscribe_daily": _cmd_subscribe_daily,
+        "/unsubscribe_daily": _cmd_unsubscribe_daily,
+    }
+
     async def _handle_chat(self, message: str, context: Optional[str]) -> str:
         """
         处理普通聊天
@@ -119,9 +192,6 @@ class MessageProcessor:
             str: AI回复
         """
         try:
-            # 检查是否是特殊命令
-            message_lower = message.lower().strip()
-            
             # 每日推送订阅管理
             if self.scheduler and "每日推送" in message:
                 if "订阅" in message or "开启" in message:
@@ -186,25 +256,27 @@ class MessageProcessor:
             return f"处理您的{self._get_task_name(task_type)}请求时出现了问题，请稍后再试。"
     
     async def _handle_query(
-        self, 
-        message: str, 
+        self,
+        message: str,
         analysis: Dict[str, Any],
-        user_id: str
+        user_id: str,
+        now: Optional[datetime] = None
     ) -> str:
         """
         处理查询请求
-        
+
         Args:
             message: 用户消息
             analysis: AI分析结果
             user_id: 用户ID
-            
+            now: 请求开始时的本地时间，避免重复获取
+
         Returns:
             str: 查询结果回复
         """
         try:
             # 分析查询意图
-            query_intent = await self._analyze_query_intent(message)
+            query_intent = await self._analyze_query_intent(message, now=now)
             
             if not query_intent:
                 # 默认查询待办事项
@@ -240,20 +312,26 @@ class MessageProcessor:
             logger.error(f"查询处理失败: {e}")
             return "查询过程中出现了问题，请稍后再试。"
     
-    async def _analyze_query_intent(self, message: str) -> Optional[Dict[str, Any]]:
+    async def _analyze_query_intent(
+        self,
+        message: str,
+        now: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         分析查询意图
-        
+
         Args:
             message: 用户消息
-            
+            now: 请求开始时的本地时间，避免重复获取
+
         Returns:
             Optional[Dict]: 查询意图分析结果
         """
-        from datetime import datetime, timedelta
-        
+        from datetime import timedelta
+
         # 获取今天和明天的日期
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         today = now.strftime('%Y-%m-%d')
         tomorrow = (now + timedelta(days=1)).strftime('%Y-%m-%d')
         current_weekday = ['周一', '周二', '周三', '周四', '周五', '周六', '周日'][now.weekday()]
@@ -363,25 +441,27 @@ class MessageProcessor:
             return "删除过程中出现了问题，请稍后再试。"
     
     async def _handle_update(
-        self, 
-        message: str, 
+        self,
+        message: str,
         analysis: Dict[str, Any],
-        user_id: str
+        user_id: str,
+        now: Optional[datetime] = None
     ) -> str:
         """
         处理更新请求
-        
+
         Args:
             message: 用户消息
             analysis: AI分析结果
             user_id: 用户ID
-            
+            now: 请求开始时的本地时间，避免重复获取
+
         Returns:
             str: 更新结果回复
         """
         try:
             # 分析更新意图
-            update_intent = await self._analyze_update_intent(message)
+            update_intent = await self._analyze_update_intent(message, now=now)
             
             if not update_intent:
                 return "抱歉，我无法理解您要更新什么内容。请明确指出要修改的项目和新的值。"
@@ -472,20 +552,26 @@ class MessageProcessor:
         
         return None
     
-    async def _analyze_update_intent(self, message: str) -> Optional[Dict[str, Any]]:
+    async def _analyze_update_intent(
+        self,
+        message: str,
+        now: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         分析更新意图
-        
+
         Args:
             message: 用户消息
-            
+            now: 请求开始时的本地时间，避免重复获取
+
         Returns:
             Optional[Dict]: 更新意图分析结果
         """
-        from datetime import datetime, timedelta
-        
+        from datetime import timedelta
+
         # 获取当前时间信息
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         today = now.strftime('%Y-%m-%d')
         tomorrow = (now + timedelta(days=1)).strftime('%Y-%m-%d')
         
@@ -557,52 +643,48 @@ class MessageProcessor:
         Returns:
             Optional[str]: 对话上下文
         """
-        return self.conversation_contexts.get(user_id, {}).get("context")
+        user_context = self.conversation_contexts.get(user_id)
+        return user_context.context if user_context else None
     
     def _update_conversation_context(
-        self, 
-        user_id: str, 
-        message: str, 
-        analysis: Dict[str, Any]
+        self,
+        user_id: str,
+        message: str,
+        analysis: Dict[str, Any],
+        now: Optional[datetime] = None
     ) -> None:
         """
         更新用户对话上下文
-        
+
         Args:
             user_id: 用户ID
             message: 用户消息
             analysis: AI分析结果
+            now: 请求开始时的UTC时间，避免重复获取
         """
-        if user_id not in self.conversation_contexts:
-            self.conversation_contexts[user_id] = {
-                "messages": [],
-                "context": "",
-                "last_task_type": None,
-                "updated_at": datetime.now(timezone.utc)
-            }
-        
-        user_context = self.conversation_contexts[user_id]
-        
-        # 添加消息到历史
-        user_context["messages"].append({
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        user_context = self.conversation_contexts.get(user_id)
+        if user_context is None:
+            user_context = self.conversation_contexts[user_id] = UserContext(updated_at=now)
+
+        # 添加消息到历史（deque自动保留最近10条）
+        user_context.messages.append({
             "message": message,
             "task_type": analysis.get("task_type"),
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": now.isoformat()
         })
-        
-        # 保留最近10条消息
-        if len(user_context["messages"]) > 10:
-            user_context["messages"] = user_context["messages"][-10:]
-        
+
         # 更新上下文摘要
-        recent_messages = user_context["messages"][-3:]  # 最近3条
+        recent_messages = list(user_context.messages)[-3:]  # 最近3条
         context_summary = "最近的对话:\n"
         for msg in recent_messages:
             context_summary += f"- {msg['message'][:50]}...\n"
-        
-        user_context["context"] = context_summary
-        user_context["last_task_type"] = analysis.get("task_type")
-        user_context["updated_at"] = datetime.now(timezone.utc)
+
+        user_context.context = context_summary
+        user_context.last_task_type = analysis.get("task_type")
+        user_context.updated_at = now
     
     def _get_task_name(self, task_type: str) -> str:
         """
@@ -4,9 +4,8 @@
 """
 
 import asyncio
-import schedule
-import threading
-from datetime import datetime, timedelta, timezone
+import concurrent.futures
+from datetime import datetime, time, timedelta, timezone
 from typing import Dict, List, Any, Optional, Callable
 from loguru import logger
 
@@ -14,18 +13,49 @@ from ..ai.gemini_client import GeminiClient
 from ..tasks.accounting import AccountingTask
 from ..tasks.todo import TodoTask
 
+# 无需展示的终态（frozenset保证C级哈希查找）
+_DONE_STATUSES = frozenset({"已完成", "已取消"})
+
+# 每日报告中各分组的展示上限
+_OVERDUE_DISPLAY_CAP = 3
+_TODAY_DISPLAY_CAP = 5
+
+# 展示文本查找表（模块级常量，避免每次调用重建）
+_PRIORITY_TEXT = {"高": "【高】", "中": "【中】", "低": "【低】"}
+_STATUS_TEXT = {"进行中": "【进行中】", "待完成": "【待完成】"}
+_WEEKDAY = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
 
 class TaskScheduler:
     """
     定时任务调度器
     """
     
+    # 每日推送时间（本地时间）
+    DAILY_PUSH_TIME = time(8, 0)
+
+    # 固定属性集合，slots省去实例__dict__
+    __slots__ = (
+        "is_running",
+        "daily_task",
+        "bots",
+        "daily_push_users",
+        "_greeting_cache",
+        "_executor",
+        "gemini_client",
+        "accounting_task",
+        "todo_task",
+    )
+
     def __init__(self):
         """初始化任务调度器"""
         self.is_running = False
-        self.schedule_thread = None
+        self.daily_task = None  # 异步定时任务
         self.bots = {}  # 存储机器人实例
         self.daily_push_users = set()  # 订阅每日推送的用户
+        self._greeting_cache = ("", "")  # (日期, 问候语) 按天缓存
+        # 专用线程池，避免与默认执行器上的其他任务争用
+        self._executor = self._new_executor()
         
         # 初始化任务组件
         self.gemini_client = GeminiClient()
@@ -33,7 +63,14 @@ class TaskScheduler:
         self.todo_task = TodoTask()
         
         logger.info("定时任务调度器初始化完成")
-    
+
+    @staticmethod
+    def _new_executor() -> concurrent.futures.ThreadPoolExecutor:
+        """创建AI调用专用线程池"""
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="scheduler-ai"
+        )
+
     def add_bot(self, platform: str, bot_instance):
         """
         添加机器人实例
@@ -53,7 +90,7 @@ class TaskScheduler:
             user_id: 用户ID
             platform: 平台名称
         """
-        self.daily_push_users.add(f"{platform}:{user_id}")
+        self.daily_push_users.add((platform, user_id))
         logger.info(f"添加每日推送用户: {platform}:{user_id}")
     
     def remove_daily_push_user(self, user_id: str, platform: str = "synology_chat"):
@@ -64,82 +101,91 @@ class TaskScheduler:
             user_id: 用户ID
             platform: 平台名称
         """
-        user_key = f"{platform}:{user_id}"
-        self.daily_push_users.discard(user_key)
+        self.daily_push_users.discard((platform, user_id))
         logger.info(f"移除每日推送用户: {platform}:{user_id}")
     
-    def setup_daily_tasks(self):
-        """设置每日定时任务"""
-        # 每天早上8点发送每日推送
-        schedule.every().day.at("08:00").do(self._run_async_task, self._daily_morning_push)
-        
-        # 每天晚上10点发送晚安和明天预览（可选）
-        # schedule.every().day.at("22:00").do(self._run_async_task, self._daily_evening_push)
-        
-        logger.info("每日定时任务设置完成")
-    
     def start(self):
         """启动定时任务调度器"""
         if self.is_running:
             logger.warning("定时任务调度器已在运行")
             return
-        
-        self.setup_daily_tasks()
+
         self.is_running = True
-        
-        # 在单独线程中运行调度器
-        self.schedule_thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        self.schedule_thread.start()
-        
+
+        # stop()会关闭线程池，重启时需要重建
+        if self._executor is None:
+            self._executor = self._new_executor()
+
+        # 在当前事件循环上调度每日任务，无需额外线程
+        self.daily_task = asyncio.create_task(self._daily_loop())
+
         logger.info("定时任务调度器启动成功")
-    
+
     def stop(self):
         """停止定时任务调度器"""
         self.is_running = False
-        schedule.clear()
+        if self.daily_task:
+            self.daily_task.cancel()
+            self.daily_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         logger.info("定时任务调度器已停止")
-    
-    def _run_scheduler(self):
-        """运行调度器循环"""
+
+    async def _daily_loop(self):
+        """每日定时循环：睡到下一个推送时间点再执行"""
         while self.is_running:
-            schedule.run_pending()
-            threading.Event().wait(60)  # 每分钟检查一次
-    
-    def _run_async_task(self, coro):
-        """在新的事件循环中运行异步任务"""
-        try:
-            # 创建新的事件循环
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(coro())
-            loop.close()
-        except Exception as e:
-            logger.error(f"执行异步任务失败: {e}")
-    
+            now = datetime.now()
+            next_run = datetime.combine(now.date(), self.DAILY_PUSH_TIME)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+
+            try:
+                await asyncio.sleep((next_run - now).total_seconds())
+            except asyncio.CancelledError:
+                break
+
+            if not self.is_running:
+                break
+
+            try:
+                await self._daily_morning_push()
+            except Exception as e:
+                logger.error(f"执行每日推送任务失败: {e}")
+
     async def _daily_morning_push(self):
         """每日早晨推送"""
         try:
             logger.info("开始执行每日早晨推送")
-            
-            for user_key in self.daily_push_users:
-                try:
-                    platform, user_id = user_key.split(":", 1)
-                    await self._send_daily_report(platform, user_id)
-                except Exception as e:
-                    logger.error(f"发送每日推送失败 {user_key}: {e}")
-            
+
+            # 共享内容（问候语、昨日收支等）只生成一次
+            context = await self._build_daily_context()
+
+            # 并发推送所有订阅用户，避免逐个串行等待
+            subscribers = list(self.daily_push_users)
+            coros = [
+                self._send_daily_report(platform, user_id, context=context)
+                for platform, user_id in subscribers
+            ]
+            results = await asyncio.gather(*coros, return_exceptions=True)
+
+            for (platform, user_id), result in zip(subscribers, results):
+                if isinstance(result, Exception):
+                    logger.error(f"发送每日推送失败 {platform}:{user_id}: {result}")
+
             logger.info("每日早晨推送完成")
-            
+
         except Exception as e:
             logger.error(f"每日早晨推送执行失败: {e}")
     
-    async def _send_daily_report(self, platform: str, user_id: str):
+    async def _send_daily_report(self, platform: str, user_id: str, context: Optional[Dict[str, str]] = None):
         """
         发送每日报告给特定用户
-        
+
         Args:
             platform: 平台名称
             user_id: 用户ID
+            context: 预先构建的共享报告上下文
         """
         try:
             # 获取机器人实例
@@ -147,9 +193,9 @@ class TaskScheduler:
             if not bot:
                 logger.error(f"未找到平台 {platform} 的机器人实例")
                 return
-            
+
             # 生成每日报告内容
-            report_content = await self._generate_daily_report(user_id)
+            report_content = await self._generate_daily_report(user_id, context=context)
             
             # 发送报告
             success = await bot.send_message(user_id, report_content)
@@ -162,53 +208,62 @@ class TaskScheduler:
         except Exception as e:
             logger.error(f"发送每日报告失败: {e}")
     
-    async def _generate_daily_report(self, user_id: str) -> str:
+    async def _build_daily_context(self) -> Dict[str, str]:
+        """
+        构建当日报告的共享上下文
+        问候语、昨日收支、今日待办对所有用户一致，只需生成一次
+
+        Returns:
+            Dict[str, str]: 共享上下文
+        """
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+        weekday = _WEEKDAY[now.weekday()]
+
+        return {
+            "today": today,
+            "yesterday": yesterday,
+            "weekday": weekday,
+            "greeting": await self._generate_morning_greeting(),
+            "yesterday_financial": await self._get_yesterday_financial_summary(yesterday),
+            "today_todos": await self._get_today_todos(today),
+        }
+
+    async def _generate_daily_report(self, user_id: str, context: Optional[Dict[str, str]] = None) -> str:
         """
         生成每日报告内容
-        
+
         Args:
             user_id: 用户ID
-            
+            context: 预先构建的共享上下文，为空时现场构建
+
         Returns:
             str: 每日报告内容
         """
         try:
-            now = datetime.now()
-            today = now.strftime('%Y-%m-%d')
-            yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
-            weekday = ['周一', '周二', '周三', '周四', '周五', '周六', '周日'][now.weekday()]
-            
-            # 生成早安问候
-            greeting = await self._generate_morning_greeting()
-            
-            # 获取昨日收支情况
-            yesterday_financial = await self._get_yesterday_financial_summary(yesterday)
-            
-            # 获取今日待办事项
-            today_todos = await self._get_today_todos(today)
-            
-            # 组装报告
-            report_parts = [
-                f"【早安】{greeting}",
-                f"今天是 {today} {weekday}",
-                "",
-                "【昨日收支】",
-                yesterday_financial,
-                "",
-                "【今日待办】", 
-                today_todos,
-                "",
+            if context is None:
+                context = await self._build_daily_context()
+
+            # 用单个f-string组装报告，避免中间列表和join
+            return (
+                f"【早安】{context['greeting']}\n"
+                f"今天是 {context['today']} {context['weekday']}\n\n"
+                f"【昨日收支】\n{context['yesterday_financial']}\n\n"
+                f"【今日待办】\n{context['today_todos']}\n\n"
                 "祝您今天工作顺利，心情愉快！"
-            ]
-            
-            return "\n".join(report_parts)
-            
+            )
+
         except Exception as e:
             logger.error(f"生成每日报告失败: {e}")
             return f"早安！今天是 {datetime.now().strftime('%Y-%m-%d')}，系统生成报告时出现问题，请稍后查看详细信息。"
     
     async def _generate_morning_greeting(self) -> str:
-        """生成个性化早安问候"""
+        """生成个性化早安问候（按天缓存，同一天内复用）"""
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        if self._greeting_cache[0] == today_str:
+            return self._greeting_cache[1]
+
         try:
             prompt = """
 请生成一条温馨的早安问候语，要求：
@@ -222,7 +277,8 @@ class TaskScheduler:
 - "早上好！希望今天的每一刻都充满阳光和好心情～"
 """
             
-            response = await asyncio.to_thread(
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
                 self.gemini_client.model.generate_content,
                 prompt
             )
@@ -230,9 +286,10 @@ class TaskScheduler:
             greeting = response.text.strip()
             # 移除可能的引号
             greeting = greeting.strip('"').strip("'")
-            
+
+            self._greeting_cache = (today_str, greeting)
             return greeting
-            
+
         except Exception as e:
             logger.error(f"生成早安问候失败: {e}")
             return "早安！新的一天开始了，愿您工作顺利，心情愉快！"
@@ -255,33 +312,34 @@ class TaskScheduler:
             if not result.success:
                 return "昨日记账数据获取失败"
             
-            records = result.data.get("records", [])
-            
-            if not records:
-                return "昨日暂无收支记录"
-            
-            # 统计收支
+            # data可能为None，空元组哨兵避免每次分配默认列表
+            records = result.data["records"] if result.data else ()
+
+            # 单次遍历完成收支统计，不构建中间列表
             income = 0.0
             expense = 0.0
-            
+            record_count = 0
+
             for record in records:
-                amount = float(record.get("金额", 0))
-                record_type = record.get("类型", "")
-                
+                record_type = record.get("类型")
                 if record_type == "收入":
-                    income += amount
+                    income += record.get("金额", 0.0)
                 elif record_type == "支出":
-                    expense += amount
-            
+                    expense += record.get("金额", 0.0)
+                record_count += 1
+
+            if record_count == 0:
+                return "昨日暂无收支记录"
+
             # 格式化输出
             summary_parts = []
-            
+
             if income > 0:
                 summary_parts.append(f"收入：{income:.2f}元")
-            
+
             if expense > 0:
                 summary_parts.append(f"支出：{expense:.2f}元")
-            
+
             if income > 0 or expense > 0:
                 net = income - expense
                 if net > 0:
@@ -290,9 +348,9 @@ class TaskScheduler:
                     summary_parts.append(f"净支出：{abs(net):.2f}元")
                 else:
                     summary_parts.append("收支平衡")
-                
-                summary_parts.append(f"共 {len(records)} 笔记录")
-            
+
+                summary_parts.append(f"共 {record_count} 笔记录")
+
             return " | ".join(summary_parts) if summary_parts else "昨日暂无收支记录"
             
         except Exception as e:
@@ -316,62 +374,64 @@ class TaskScheduler:
             if not all_result.success:
                 return "今日待办事项获取失败"
             
-            all_todos = all_result.data.get("records", [])
-            
-            # 筛选今日相关的待办事项
+            all_todos = all_result.data["records"] if all_result.data else ()
+
+            # 单次遍历分组，超出展示上限的只计数不存储
             today_todos = []
             overdue_todos = []
-            
+            today_extra = 0
+            overdue_extra = 0
+
             for todo in all_todos:
-                status = todo.get("状态", "")
-                due_date = todo.get("截止日期", "")
-                
                 # 跳过已完成和已取消的任务
-                if status in ["已完成", "已取消"]:
-                    continue
-                
-                # 没有截止日期的任务也包含在内
-                if not due_date:
-                    today_todos.append(todo)
+                if todo.get("状态", "") in _DONE_STATUSES:
                     continue
-                
-                # 比较日期
-                if due_date == today_date:
-                    today_todos.append(todo)
+
+                due_date = todo.get("截止日期", "")
+
+                # 没有截止日期的任务也包含在今日分组内
+                if not due_date or due_date == today_date:
+                    if len(today_todos) < _TODAY_DISPLAY_CAP:
+                        today_todos.append(todo)
+                    else:
+                        today_extra += 1
                 elif due_date < today_date:
-                    overdue_todos.append(todo)
-            
+                    if len(overdue_todos) < _OVERDUE_DISPLAY_CAP:
+                        overdue_todos.append(todo)
+                    else:
+                        overdue_extra += 1
+
             # 格式化输出
             todo_parts = []
-            
+
             if overdue_todos:
                 todo_parts.append("【逾期任务】")
-                for todo in overdue_todos[:3]:  # 最多显示3个逾期任务
+                for todo in overdue_todos:
                     title = todo.get("标题", "")
                     priority = todo.get("优先级", "")
                     due_date = todo.get("截止日期", "")
-                    priority_text = {"高": "【高】", "中": "【中】", "低": "【低】"}.get(priority, "")
+                    priority_text = _PRIORITY_TEXT.get(priority, "")
                     todo_parts.append(f"- {title} {priority_text} (逾期: {due_date})")
-                
-                if len(overdue_todos) > 3:
-                    todo_parts.append(f"... 还有 {len(overdue_todos) - 3} 个逾期任务")
+
+                if overdue_extra:
+                    todo_parts.append(f"... 还有 {overdue_extra} 个逾期任务")
                 todo_parts.append("")
-            
+
             if today_todos:
                 todo_parts.append("【今日任务】")
-                for todo in today_todos[:5]:  # 最多显示5个今日任务
+                for todo in today_todos:
                     title = todo.get("标题", "")
                     priority = todo.get("优先级", "")
                     status = todo.get("状态", "")
-                    priority_text = {"高": "【高】", "中": "【中】", "低": "【低】"}.get(priority, "")
-                    status_text = {"进行中": "【进行中】", "待完成": "【待完成】"}.get(status, "")
+                    priority_text = _PRIORITY_TEXT.get(priority, "")
+                    status_text = _STATUS_TEXT.get(status, "")
                     todo_parts.append(f"- {title} {priority_text} {status_text}")
-                
-                if len(today_todos) > 5:
-                    todo_parts.append(f"... 还有 {len(today_todos) - 5} 个任务")
+
+                if today_extra:
+                    todo_parts.append(f"... 还有 {today_extra} 个任务")
             else:
                 todo_parts.append("今日暂无特定截止日期的任务")
-            
+
             return "\n".join(todo_parts) if todo_parts else "今日暂无待办事项"
             
         except Exception as e:
@@ -413,8 +473,7 @@ class TaskScheduler:
         Returns:
             bool: 是否已订阅
         """
-        user_key = f"{platform}:{user_id}"
-        return user_key in self.daily_push_users
+        return (platform, user_id) in self.daily_push_users
     
     async def test_daily_push(self) -> str:
         """
@@ -429,18 +488,30 @@ class TaskScheduler:
             if not self.daily_push_users:
                 return "⚠️ 暂无订阅用户，无法测试推送功能"
             
-            success_count = 0
             total_count = len(self.daily_push_users)
-            
-            for user_key in self.daily_push_users:
-                try:
-                    platform, user_id = user_key.split(":", 1)
-                    await self._send_daily_report(platform, user_id)
+
+            # 共享内容只生成一次，推送本身并发执行并用信号量限流
+            context = await self._build_daily_context()
+            semaphore = asyncio.Semaphore(16)
+
+            async def _push_one(platform: str, user_id: str):
+                async with semaphore:
+                    await self._send_daily_report(platform, user_id, context=context)
+
+            subscribers = list(self.daily_push_users)
+            results = await asyncio.gather(
+                *[_push_one(platform, user_id) for platform, user_id in subscribers],
+                return_exceptions=True
+            )
+
+            success_count = 0
+            for (platform, user_id), push_result in zip(subscribers, results):
+                if isinstance(push_result, Exception):
+                    logger.error(f"测试推送失败 {platform}:{user_id}: {push_result}")
+                else:
                     success_count += 1
-                    logger.info(f"测试推送成功: {user_key}")
-                except Exception as e:
-                    logger.error(f"测试推送失败 {user_key}: {e}")
-            
+                    logger.info(f"测试推送成功: {platform}:{user_id}")
+
             result = f"✅ 测试完成！成功推送 {success_count}/{total_count} 个用户"
             logger.info(result)
             return result
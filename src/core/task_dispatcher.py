@@ -4,6 +4,9 @@
 """
 
 import asyncio
+import functools
+import itertools
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Tuple
 from loguru import logger
@@ -17,13 +20,69 @@ class TaskDispatcher:
     负责任务的创建、执行、查询和管理
     """
     
+    # 任务历史的最大保留条数
+    HISTORY_MAX_ENTRIES = 10000
+
+    # 固定属性集合，slots省去实例__dict__
+    __slots__ = (
+        "task_history",
+        "_user_index",
+        "_start_times",
+        "_exec_seq",
+        "_task_cache",
+        "_global_stats",
+        "_user_stats",
+    )
+
     def __init__(self):
         """初始化任务分发器"""
-        # 任务执行历史（简单实现，生产环境建议使用数据库）
-        self.task_history = {}
-        
+        # 任务执行历史（有序便于淘汰最旧记录，生产环境建议使用数据库）
+        self.task_history: OrderedDict = OrderedDict()
+
+        # 辅助索引：按用户的执行ID队列、按插入顺序的开始时间戳
+        self._user_index: Dict[str, deque] = {}
+        self._start_times: OrderedDict = OrderedDict()
+
+        # 单调递增序号，保证并发执行时ID不冲突
+        self._exec_seq = itertools.count()
+
+        # 任务实例缓存（任务类无每次调用状态，可安全复用）
+        self._task_cache: Dict[str, BaseTask] = {}
+
+        # 运行计数器：写入时增量维护，读取统计时无需遍历历史
+        self._global_stats = self._new_stat_bucket()
+        self._user_stats: Dict[str, Dict[str, Any]] = defaultdict(self._new_stat_bucket)
+
         logger.info("任务分发器初始化完成")
     
+    def _get_task(self, task_type: str) -> Optional[BaseTask]:
+        """
+        获取（并缓存）指定类型的任务实例
+
+        Args:
+            task_type: 任务类型
+
+        Returns:
+            Optional[BaseTask]: 任务实例，类型不存在时返回None
+        """
+        task = self._task_cache.get(task_type)
+        if task is None:
+            task = TaskFactory.create_task(task_type)
+            if task is not None:
+                self._task_cache[task_type] = task
+        return task
+
+    @staticmethod
+    def _new_stat_bucket() -> Dict[str, Any]:
+        """创建一个空的统计计数器桶"""
+        return {
+            "total": 0,
+            "success": 0,
+            "failed": 0,
+            "type_stats": defaultdict(lambda: {"total": 0, "success": 0, "failed": 0}),
+            "daily": defaultdict(int),
+        }
+
     async def execute_task(
         self, 
         task_type: str, 
@@ -45,7 +104,7 @@ class TaskDispatcher:
             logger.info(f"执行任务: {task_type}, 用户: {user_id}")
             
             # 创建任务实例
-            task = TaskFactory.create_task(task_type)
+            task = self._get_task(task_type)
             if not task:
                 return TaskResult(
                     success=False,
@@ -94,7 +153,7 @@ class TaskDispatcher:
             logger.info(f"查询数据: {data_type}, 用户: {user_id}")
             
             # 创建任务实例
-            task = TaskFactory.create_task(data_type)
+            task = self._get_task(data_type)
             if not task:
                 return TaskResult(
                     success=False,
@@ -135,7 +194,7 @@ class TaskDispatcher:
             logger.info(f"删除所有数据: {data_type}, 用户: {user_id}")
             
             # 创建任务实例
-            task = TaskFactory.create_task(data_type)
+            task = self._get_task(data_type)
             if not task:
                 return TaskResult(
                     success=False,
@@ -184,7 +243,7 @@ class TaskDispatcher:
             logger.info(f"更新任务状态: {data_type}, 任务: {task_name}, 用户: {user_id}")
             
             # 创建任务实例
-            task = TaskFactory.create_task(data_type)
+            task = self._get_task(data_type)
             if not task:
                 return TaskResult(
                     success=False,
@@ -230,20 +289,19 @@ class TaskDispatcher:
                 for task in tasks
             ]
             
-            results = await asyncio.gather(*task_coroutines, return_exceptions=True)
-            
-            # 处理异常结果
-            processed_results = []
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    processed_results.append(TaskResult(
-                        success=False,
-                        error=str(result),
-                        message=f"第 {i+1} 个任务执行失败"
-                    ))
-                else:
-                    processed_results.append(result)
-            
+            # return_exceptions=True 保证gather不抛出，异常结果就地包装
+            raw_results = await asyncio.gather(*task_coroutines, return_exceptions=True)
+
+            processed_results = [
+                result if not isinstance(result, Exception)
+                else TaskResult(
+                    success=False,
+                    error=str(result),
+                    message=f"第 {i+1} 个任务执行失败"
+                )
+                for i, result in enumerate(raw_results)
+            ]
+
             success_count = sum(1 for r in processed_results if r.success)
             logger.info(f"批量任务执行完成: {success_count}/{len(tasks)} 成功")
             
@@ -285,16 +343,19 @@ class TaskDispatcher:
             List[Dict]: 任务历史记录
         """
         try:
-            user_tasks = [
-                task for task in self.task_history.values()
-                if task.get("user_id") == user_id
-            ]
-            
-            # 按时间倒序排列
-            user_tasks.sort(key=lambda x: x.get("start_time", ""), reverse=True)
-            
-            return user_tasks[:limit]
-            
+            # 按用户索引直接取最近的记录，避免全量扫描和排序
+            user_tasks = []
+            execution_ids = self._user_index.get(user_id)
+            if execution_ids:
+                for execution_id in reversed(execution_ids):
+                    task = self.task_history.get(execution_id)
+                    if task is not None:
+                        user_tasks.append(task)
+                        if len(user_tasks) >= limit:
+                            break
+
+            return user_tasks
+
         except Exception as e:
             logger.error(f"获取用户任务历史失败: {e}")
             return []
@@ -310,46 +371,27 @@ class TaskDispatcher:
             Dict[str, Any]: 统计信息
         """
         try:
-            # 过滤任务
-            tasks = list(self.task_history.values())
+            # 计数器在写入路径增量维护，这里直接读取；
+            # 用.get避免defaultdict在读路径上为陌生用户落下空桶
             if user_id:
-                tasks = [task for task in tasks if task.get("user_id") == user_id]
-            
-            # 统计分析
-            total_tasks = len(tasks)
-            successful_tasks = len([task for task in tasks if task.get("success", False)])
-            failed_tasks = total_tasks - successful_tasks
-            
-            # 按类型统计
-            type_stats = {}
-            for task in tasks:
-                task_type = task.get("task_type", "unknown")
-                if task_type not in type_stats:
-                    type_stats[task_type] = {"total": 0, "success": 0, "failed": 0}
-                
-                type_stats[task_type]["total"] += 1
-                if task.get("success", False):
-                    type_stats[task_type]["success"] += 1
-                else:
-                    type_stats[task_type]["failed"] += 1
-            
-            # 最近活跃时间
-            recent_tasks = [
-                task for task in tasks
-                if task.get("start_time") and 
-                datetime.fromisoformat(task["start_time"]).date() == datetime.now().date()
-            ]
-            
+                bucket = self._user_stats.get(user_id) or self._new_stat_bucket()
+            else:
+                bucket = self._global_stats
+
+            total_tasks = bucket["total"]
+            successful_tasks = bucket["success"]
+            today_key = datetime.now(timezone.utc).date().isoformat()
+
             stats = {
                 "total_tasks": total_tasks,
                 "successful_tasks": successful_tasks,
-                "failed_tasks": failed_tasks,
+                "failed_tasks": bucket["failed"],
                 "success_rate": round(successful_tasks / total_tasks * 100, 2) if total_tasks > 0 else 0,
-                "type_statistics": type_stats,
-                "today_tasks": len(recent_tasks),
-                "available_task_types": TaskFactory.get_available_task_types()
+                "type_statistics": {k: dict(v) for k, v in bucket["type_stats"].items()},
+                "today_tasks": bucket["daily"].get(today_key, 0),
+                "available_task_types": _available_task_types()
             }
-            
+
             return stats
             
         except Exception as e:
@@ -372,7 +414,7 @@ class TaskDispatcher:
             Tuple[bool, List[str]]: (是否有效, 错误消息列表)
         """
         try:
-            task = TaskFactory.create_task(task_type)
+            task = self._get_task(task_type)
             if not task:
                 return False, [f"未知的任务类型: {task_type}"]
             
@@ -399,18 +441,11 @@ class TaskDispatcher:
     def get_available_tasks(self) -> Dict[str, Dict[str, Any]]:
         """
         获取所有可用的任务类型及其信息
-        
+
         Returns:
             Dict[str, Dict]: 任务类型信息
         """
-        available_tasks = {}
-        
-        for task_type in TaskFactory.get_available_task_types():
-            task_info = TaskFactory.get_task_info(task_type)
-            if task_info:
-                available_tasks[task_type] = task_info
-        
-        return available_tasks
+        return _available_tasks_impl()
     
     def _record_task_start(
         self, 
@@ -429,19 +464,65 @@ class TaskDispatcher:
         Returns:
             str: 执行ID
         """
-        execution_id = f"{user_id}_{task_type}_{datetime.now().timestamp()}"
-        
+        now = datetime.now(timezone.utc)
+        execution_id = f"{user_id}_{task_type}_{next(self._exec_seq)}"
+
         self.task_history[execution_id] = {
             "execution_id": execution_id,
             "task_type": task_type,
             "user_id": user_id,
             "task_data": task_data,
-            "start_time": datetime.now(timezone.utc).isoformat(),
+            "start_time": now.isoformat(),  # 展示用
+            "start_ts": now.timestamp(),  # 比较用，避免重复解析ISO字符串
             "status": "running"
         }
-        
+
+        # 维护辅助索引
+        self._user_index.setdefault(user_id, deque()).append(execution_id)
+        self._start_times[execution_id] = now.timestamp()
+
+        # 超过上限时淘汰最旧的记录，保证内存有界
+        while len(self.task_history) > self.HISTORY_MAX_ENTRIES:
+            old_execution_id, old_task = self.task_history.popitem(last=False)
+            self._start_times.pop(old_execution_id, None)
+            self._drop_from_user_index(old_execution_id, old_task.get("user_id"))
+
+        # 维护运行计数器（任务完成前先计为失败，结果成功时再转移）
+        today_key = now.date().isoformat()
+        for bucket in (self._global_stats, self._user_stats[user_id]):
+            bucket["total"] += 1
+            bucket["failed"] += 1
+            type_stat = bucket["type_stats"][task_type]
+            type_stat["total"] += 1
+            type_stat["failed"] += 1
+            bucket["daily"][today_key] += 1
+
         return execution_id
-    
+
+    def _drop_from_user_index(self, execution_id: str, user_id: Optional[str]) -> None:
+        """
+        从用户索引中移除一条执行记录，空队列随之删除
+
+        Args:
+            execution_id: 执行ID
+            user_id: 记录所属用户ID
+        """
+        if user_id is None:
+            return
+        ids = self._user_index.get(user_id)
+        if not ids:
+            return
+        # 淘汰总是从最旧记录开始，正常情况下就是该用户队列的头部
+        if ids[0] == execution_id:
+            ids.popleft()
+        else:
+            try:
+                ids.remove(execution_id)
+            except ValueError:
+                return
+        if not ids:
+            del self._user_index[user_id]
+
     def _record_task_result(self, execution_id: str, result: TaskResult) -> None:
         """
         记录任务结果
@@ -450,15 +531,28 @@ class TaskDispatcher:
             execution_id: 执行ID
             result: 任务结果
         """
-        if execution_id in self.task_history:
-            self.task_history[execution_id].update({
-                "end_time": datetime.now(timezone.utc).isoformat(),
-                "status": "completed",
-                "success": result.success,
-                "result_data": result.data,
-                "message": result.message,
-                "error": result.error
-            })
+        task = self.task_history.get(execution_id)
+        if task is None:
+            return
+
+        task.update({
+            "end_time": datetime.now(timezone.utc).isoformat(),
+            "status": "completed",
+            "success": result.success,
+            "result_data": result.data,
+            "message": result.message,
+            "error": result.error
+        })
+
+        # 任务成功时把计数从失败转移到成功
+        if result.success:
+            task_type = task.get("task_type", "unknown")
+            for bucket in (self._global_stats, self._user_stats[task.get("user_id", "")]):
+                bucket["failed"] -= 1
+                bucket["success"] += 1
+                type_stat = bucket["type_stats"][task_type]
+                type_stat["failed"] -= 1
+                type_stat["success"] += 1
     
     async def cleanup_old_history(self, days_to_keep: int = 30) -> None:
         """
@@ -469,18 +563,40 @@ class TaskDispatcher:
         """
         try:
             cutoff_time = datetime.now(timezone.utc).timestamp() - (days_to_keep * 24 * 3600)
-            
-            old_executions = [
-                execution_id for execution_id, task in self.task_history.items()
-                if task.get("start_time") and 
-                datetime.fromisoformat(task["start_time"]).timestamp() < cutoff_time
-            ]
-            
-            for execution_id in old_executions:
-                del self.task_history[execution_id]
-            
-            if old_executions:
-                logger.info(f"清理了 {len(old_executions)} 条旧的任务历史记录")
-                
+
+            # _start_times按插入顺序排列，从头部弹出过期记录即可
+            cleaned_count = 0
+            while self._start_times:
+                execution_id, start_ts = next(iter(self._start_times.items()))
+                if start_ts >= cutoff_time:
+                    break
+                self._start_times.popitem(last=False)
+                task = self.task_history.pop(execution_id, None)
+                if task is not None:
+                    self._drop_from_user_index(execution_id, task.get("user_id"))
+                cleaned_count += 1
+
+            if cleaned_count:
+                logger.info(f"清理了 {cleaned_count} 条旧的任务历史记录")
+
         except Exception as e:
-            logger.error(f"清理任务历史失败: {e}") 
\ No newline at end of file
+            logger.error(f"清理任务历史失败: {e}") 
+
+
+@functools.lru_cache(maxsize=1)
+def _available_task_types() -> Tuple[str, ...]:
+    """缓存注册的任务类型列表（运行期不会变化）"""
+    return tuple(TaskFactory.get_available_task_types())
+
+
+@functools.lru_cache(maxsize=1)
+def _available_tasks_impl() -> Dict[str, Dict[str, Any]]:
+    """缓存任务类型信息表（静态数据，首次调用时构建）"""
+    available_tasks = {}
+
+    for task_type in _available_task_types():
+        task_info = TaskFactory.get_task_info(task_type)
+        if task_info:
+            available_tasks[task_type] = task_info
+
+    return available_tasks
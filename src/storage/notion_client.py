@@ -4,20 +4,112 @@ Notion API 客户端
 """
 
 import asyncio
+import sys
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional, Union
-from notion_client import Client
-from notion_client.helpers import collect_paginated_api
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
+import httpx
+from notion_client import AsyncClient
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时走stdlib json
+    orjson = None
 from loguru import logger
 from ..config.settings import settings
 
 
+def _format_date(value):
+    """日期属性格式化：接受datetime或ISO字符串"""
+    if isinstance(value, datetime):
+        return {"date": {"start": value.isoformat()}}
+    elif isinstance(value, str):
+        return {"date": {"start": value}}
+    else:
+        return {"date": None}
+
+
+def _format_multi_select(value):
+    """多选属性格式化：接受列表或单值"""
+    if isinstance(value, list):
+        return {"multi_select": [{"name": str(v)} for v in value]}
+    else:
+        return {"multi_select": [{"name": str(value)}]}
+
+
+async def _fast_json_hook(response: httpx.Response) -> None:
+    """httpx响应钩子：用orjson解码JSON正文（中文长文本下快2~4倍）"""
+    original_json = response.json
+
+    def _json(**kwargs):
+        try:
+            return orjson.loads(response.content)
+        except Exception:
+            # 异常正文（如错误页）回退stdlib解析
+            return original_json(**kwargs)
+
+    response.json = _json
+
+
+# 驻留高频中文属性名：大结果集中键不再按行重复占用内存
+_INTERNED_KEYS = {
+    k: sys.intern(k)
+    for k in (
+        "标题", "金额", "分类", "日期", "描述", "类型",
+        "名称", "价格", "计费周期", "下次计费", "状态",
+        "优先级", "截止日期",
+    )
+}
+
+
+# 属性格式化/提取的分发表：一次哈希查找替代逐个elif比较
+_FORMATTERS = {
+    "title": lambda v: {"title": [{"text": {"content": str(v)}}]},
+    "rich_text": lambda v: {"rich_text": [{"text": {"content": str(v)}}]},
+    "number": lambda v: {"number": float(v) if v is not None else None},
+    "select": lambda v: {"select": {"name": str(v)} if v else None},
+    "multi_select": _format_multi_select,
+    "date": _format_date,
+    "checkbox": lambda v: {"checkbox": bool(v)},
+    "url": lambda v: {"url": str(v) if v else None},
+    "email": lambda v: {"email": str(v) if v else None},
+    "phone_number": lambda v: {"phone_number": str(v) if v else None},
+}
+
+# 未知类型默认按富文本处理
+_DEFAULT_FORMATTER = _FORMATTERS["rich_text"]
+
+_EXTRACTORS = {
+    "title": lambda p: "".join(item["plain_text"] for item in p.get("title", ())),
+    "rich_text": lambda p: "".join(item["plain_text"] for item in p.get("rich_text", ())),
+    # None统一折叠为0.0，调用方无需再做 or 0 分支
+    "number": lambda p: p.get("number") or 0.0,
+    "select": lambda p: p["select"]["name"] if p.get("select") else None,
+    "multi_select": lambda p: [item["name"] for item in p.get("multi_select", ())],
+    "date": lambda p: p["date"].get("start") if p.get("date") else None,
+    "checkbox": lambda p: p.get("checkbox", False),
+    "url": lambda p: p.get("url"),
+    "email": lambda p: p.get("email"),
+    "phone_number": lambda p: p.get("phone_number"),
+    "created_time": lambda p: p.get("created_time"),
+    "last_edited_time": lambda p: p.get("last_edited_time"),
+}
+
+
 class NotionClient:
     """
     Notion API 客户端
     提供对Notion数据库的CRUD操作
     """
-    
+
+    # 数据库架构缓存有效期（秒），架构极少变化
+    SCHEMA_CACHE_TTL = 600
+
+    # 查询结果缓存的有效期（秒）与容量上限
+    QUERY_CACHE_TTL = 300
+    QUERY_CACHE_SIZE = 64
+
     def __init__(self, token: Optional[str] = None):
         """
         初始化Notion客户端
@@ -29,11 +121,51 @@ class NotionClient:
         if not self.token:
             raise ValueError("Notion令牌未配置")
         
-        self.client = Client(auth=self.token)
+        # 原生异步客户端 + 调优连接池：长连接复用，无线程池跳转
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            event_hooks={"response": [_fast_json_hook]} if orjson else {},
+        )
+        self.client = AsyncClient(auth=self.token, client=http_client)
         self.databases = settings.notion.databases
-        
+
+        # 配置内置架构: database_id -> Notion形态的properties映射
+        self._config_schemas: Dict[str, Dict[str, Any]] = {
+            did: {prop: {"type": prop_type} for prop, prop_type in schema.items()}
+            for name, schema in settings.notion.schemas.items()
+            if (did := self.databases.get(name))
+        }
+
+        # 数据库架构缓存: database_id -> (过期时间戳, properties)
+        self._schema_cache: Dict[str, Any] = {}
+        # users.me()结果缓存（连接测试无需每次都请求）
+        self._me_cache: Optional[Dict[str, Any]] = None
+        # 查询结果缓存(LRU+TTL): 查询键 -> (最新last_edited_time, 写入时间, 解析结果)
+        self._query_cache: "OrderedDict[Any, Any]" = OrderedDict()
+        # 架构预热后台任务（首次缺架构时惰性启动）
+        self._warmup_task: Optional[asyncio.Task] = None
+
+        # 并发上限对齐Notion官方约3请求/秒的限速
+        self._semaphore = asyncio.Semaphore(3)
+
         logger.info("Notion客户端初始化完成")
     
+    async def _call(self, fn, *args, **kwargs):
+        """
+        执行SDK调用并施加并发上限
+
+        Args:
+            fn: 要执行的异步SDK方法
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: 调用返回值
+        """
+        async with self._semaphore:
+            return await fn(*args, **kwargs)
+
     async def test_connection(self) -> bool:
         """
         测试Notion连接
@@ -42,103 +174,151 @@ class NotionClient:
             bool: 连接是否成功
         """
         try:
-            # 获取用户信息来测试连接
-            user = self.client.users.me()
-            logger.info(f"Notion连接成功，用户: {user.get('name', 'Unknown')}")
+            # 获取用户信息来测试连接（结果缓存，重复调用不再请求）
+            if self._me_cache is None:
+                self._me_cache = await self._call(self.client.users.me)
+            logger.info(f"Notion连接成功，用户: {self._me_cache.get('name', 'Unknown')}")
             return True
         except Exception as e:
             logger.error(f"Notion连接失败: {e}")
             return False
     
+    async def warmup(self) -> None:
+        """
+        预热所有已配置数据库的架构缓存
+        应用启动时调用一次，消除首个用户请求的冷启动往返
+        """
+        await self._warm_all_schemas()
+
+    async def _fetch_schema(self, database_id: str) -> Dict[str, Any]:
+        """
+        拉取并缓存单个数据库的架构
+
+        Args:
+            database_id: 数据库ID
+
+        Returns:
+            Dict: 数据库properties架构
+        """
+        database_info = await self._call(self.client.databases.retrieve, database_id=database_id)
+        db_properties = database_info.get("properties", {})
+        self._schema_cache[database_id] = (time.monotonic() + self.SCHEMA_CACHE_TTL, db_properties)
+        return db_properties
+
+    async def _warm_all_schemas(self) -> None:
+        """并发拉取所有已配置数据库的架构（单次gather）"""
+        now = time.monotonic()
+        stale_ids = [
+            did for did in self.databases.values()
+            if did and did not in self._config_schemas and not (
+                (cached := self._schema_cache.get(did)) and cached[0] > now
+            )
+        ]
+        if not stale_ids:
+            return
+
+        results = await asyncio.gather(
+            *[self._fetch_schema(did) for did in stale_ids],
+            return_exceptions=True
+        )
+        warmed = sum(1 for r in results if not isinstance(r, Exception))
+        logger.info(f"Notion架构预热完成: {warmed}/{len(stale_ids)} 个数据库")
+
+    async def audit_schema(self, database_name: str) -> Dict[str, Any]:
+        """
+        对比配置内置架构与线上实际架构，检查漂移
+
+        Args:
+            database_name: 数据库名称
+
+        Returns:
+            Dict: {"missing": 配置有而线上没有, "extra": 线上有而配置没有, "type_mismatch": 类型不一致}
+        """
+        database_id = self.databases.get(database_name)
+        config_schema = settings.notion.schemas.get(database_name, {})
+        if not database_id or not config_schema:
+            return {}
+
+        live = await self._fetch_schema(database_id)
+        live_types = {name: prop.get("type") for name, prop in live.items()}
+
+        return {
+            "missing": [name for name in config_schema if name not in live_types],
+            "extra": [name for name in live_types if name not in config_schema],
+            "type_mismatch": [
+                name for name, prop_type in config_schema.items()
+                if name in live_types and live_types[name] != prop_type
+            ],
+        }
+
+    async def _get_db_schema(self, database_id: str) -> Dict[str, Any]:
+        """
+        获取数据库属性架构（带TTL缓存，避免每次写入都多一次API往返）
+        首次未命中时后台并发预热全部数据库，后续读取全部命中缓存
+
+        Args:
+            database_id: 数据库ID
+
+        Returns:
+            Dict: 数据库properties架构
+        """
+        # 应用自有数据库的架构由配置提供，无需任何API往返
+        config_schema = self._config_schemas.get(database_id)
+        if config_schema:
+            return config_schema
+
+        cached = self._schema_cache.get(database_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        # 一个数据库缺架构时，顺带并发预热其余数据库
+        if self._warmup_task is None or self._warmup_task.done():
+            self._warmup_task = asyncio.ensure_future(self._warm_all_schemas())
+        await self._warmup_task
+
+        cached = self._schema_cache.get(database_id)
+        if cached:
+            return cached[1]
+        # 预热失败（如单库错误）时退回单独拉取
+        return await self._fetch_schema(database_id)
+
+    def invalidate_schema(self, database_name: str) -> None:
+        """
+        使指定数据库的架构缓存失效（数据库结构变更后调用）
+
+        Args:
+            database_name: 数据库名称
+        """
+        database_id = self.databases.get(database_name)
+        if database_id:
+            self._schema_cache.pop(database_id, None)
+
     def _format_property_value(self, prop_type: str, value: Any) -> Dict[str, Any]:
         """
         格式化属性值为Notion API格式
-        
+
         Args:
             prop_type: 属性类型
             value: 属性值
-            
+
         Returns:
             Dict: 格式化后的属性值
         """
-        if prop_type == "title":
-            return {"title": [{"text": {"content": str(value)}}]}
-        elif prop_type == "rich_text":
-            return {"rich_text": [{"text": {"content": str(value)}}]}
-        elif prop_type == "number":
-            return {"number": float(value) if value is not None else None}
-        elif prop_type == "select":
-            return {"select": {"name": str(value)} if value else None}
-        elif prop_type == "multi_select":
-            if isinstance(value, list):
-                return {"multi_select": [{"name": str(v)} for v in value]}
-            else:
-                return {"multi_select": [{"name": str(value)}]}
-        elif prop_type == "date":
-            if isinstance(value, datetime):
-                return {"date": {"start": value.isoformat()}}
-            elif isinstance(value, str):
-                return {"date": {"start": value}}
-            else:
-                return {"date": None}
-        elif prop_type == "checkbox":
-            return {"checkbox": bool(value)}
-        elif prop_type == "url":
-            return {"url": str(value) if value else None}
-        elif prop_type == "email":
-            return {"email": str(value) if value else None}
-        elif prop_type == "phone_number":
-            return {"phone_number": str(value) if value else None}
-        else:
-            # 默认作为富文本处理
-            return {"rich_text": [{"text": {"content": str(value)}}]}
-    
+        return _FORMATTERS.get(prop_type, _DEFAULT_FORMATTER)(value)
+
     def _extract_property_value(self, prop: Dict[str, Any]) -> Any:
         """
         从Notion属性中提取值
-        
+
         Args:
             prop: Notion属性对象
-            
+
         Returns:
             Any: 提取的值
         """
-        prop_type = prop.get("type")
-        
-        if prop_type == "title":
-            title_list = prop.get("title", [])
-            return "".join([item.get("plain_text", "") for item in title_list])
-        elif prop_type == "rich_text":
-            rich_text_list = prop.get("rich_text", [])
-            return "".join([item.get("plain_text", "") for item in rich_text_list])
-        elif prop_type == "number":
-            return prop.get("number")
-        elif prop_type == "select":
-            select_obj = prop.get("select")
-            return select_obj.get("name") if select_obj else None
-        elif prop_type == "multi_select":
-            multi_select_list = prop.get("multi_select", [])
-            return [item.get("name") for item in multi_select_list]
-        elif prop_type == "date":
-            date_obj = prop.get("date")
-            if date_obj:
-                return date_obj.get("start")
-            return None
-        elif prop_type == "checkbox":
-            return prop.get("checkbox", False)
-        elif prop_type == "url":
-            return prop.get("url")
-        elif prop_type == "email":
-            return prop.get("email")
-        elif prop_type == "phone_number":
-            return prop.get("phone_number")
-        elif prop_type == "created_time":
-            return prop.get("created_time")
-        elif prop_type == "last_edited_time":
-            return prop.get("last_edited_time")
-        else:
-            return None
-    
+        extractor = _EXTRACTORS.get(prop.get("type"))
+        return extractor(prop) if extractor else None
+
     async def create_page(self, database_name: str, properties: Dict[str, Any]) -> Optional[str]:
         """
         在指定数据库中创建新页面
@@ -156,26 +336,22 @@ class NotionClient:
                 logger.error(f"数据库 '{database_name}' 未配置")
                 return None
             
-            # 获取数据库架构来确定属性类型
-            database_info = self.client.databases.retrieve(database_id=database_id)
-            db_properties = database_info.get("properties", {})
+            # 获取数据库架构来确定属性类型（带缓存）
+            db_properties = await self._get_db_schema(database_id)
             
             # 格式化属性
-            formatted_properties = {}
-            for prop_name, prop_value in properties.items():
-                if prop_name in db_properties:
-                    prop_type = db_properties[prop_name].get("type")
-                    formatted_properties[prop_name] = self._format_property_value(prop_type, prop_value)
-                else:
-                    logger.warning(f"属性 '{prop_name}' 在数据库 '{database_name}' 中不存在")
+            formatted_properties = self._format_properties(database_name, db_properties, properties)
             
             # 创建页面
-            response = self.client.pages.create(
+            response = await self._call(
+                self.client.pages.create,
                 parent={"database_id": database_id},
                 properties=formatted_properties
             )
             
             page_id = response.get("id")
+            if page_id:
+                self._invalidate_query_cache()
             logger.info(f"在数据库 '{database_name}' 中创建页面成功: {page_id}")
             return page_id
             
@@ -183,116 +359,390 @@ class NotionClient:
             logger.error(f"创建页面失败: {e}")
             return None
     
+    def _format_properties(
+        self,
+        database_name: str,
+        db_properties: Dict[str, Any],
+        properties: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        按数据库架构格式化一组属性
+
+        Args:
+            database_name: 数据库名称（仅用于日志）
+            db_properties: 数据库properties架构
+            properties: 原始属性值
+
+        Returns:
+            Dict: 格式化后的属性
+        """
+        formatted_properties = {}
+        for prop_name, prop_value in properties.items():
+            if prop_name in db_properties:
+                prop_type = db_properties[prop_name].get("type")
+                formatted_properties[prop_name] = self._format_property_value(prop_type, prop_value)
+            else:
+                logger.warning(f"属性 '{prop_name}' 在数据库 '{database_name}' 中不存在")
+        return formatted_properties
+
+    async def create_pages(
+        self,
+        database_name: str,
+        properties_list: List[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """
+        批量创建页面：架构只取一次，创建请求有界并发
+
+        Args:
+            database_name: 数据库名称
+            properties_list: 各页面的属性列表
+
+        Returns:
+            List[Optional[str]]: 各页面ID，失败项为None
+        """
+        try:
+            database_id = self.databases.get(database_name)
+            if not database_id:
+                logger.error(f"数据库 '{database_name}' 未配置")
+                return [None] * len(properties_list)
+
+            db_properties = await self._get_db_schema(database_id)
+            parent = {"database_id": database_id}
+
+            # 先全部格式化，再并发提交（_call内的信号量限速）
+            formatted_list = [
+                self._format_properties(database_name, db_properties, properties)
+                for properties in properties_list
+            ]
+
+            responses = await asyncio.gather(
+                *[
+                    self._call(self.client.pages.create, parent=parent, properties=fp)
+                    for fp in formatted_list
+                ],
+                return_exceptions=True
+            )
+
+            page_ids = [
+                None if isinstance(resp, Exception) else resp.get("id")
+                for resp in responses
+            ]
+
+            created = sum(1 for pid in page_ids if pid)
+            if created:
+                self._invalidate_query_cache()
+            logger.info(f"批量创建页面完成: {created}/{len(properties_list)} 成功")
+            return page_ids
+
+        except Exception as e:
+            logger.error(f"批量创建页面失败: {e}")
+            return [None] * len(properties_list)
+
+    def _parse_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        解析单个Notion页面为扁平记录
+
+        Args:
+            page: Notion页面对象
+
+        Returns:
+            Dict: 解析后的记录
+        """
+        page_data = {
+            "id": page.get("id"),
+            "created_time": page.get("created_time"),
+            "last_edited_time": page.get("last_edited_time"),
+            "url": page.get("url")
+        }
+
+        # 解析热循环：局部绑定查找表，省去每个属性的方法调用与全局查找
+        extractors_get = _EXTRACTORS.get
+        keys_get = _INTERNED_KEYS.get
+        for prop_name, prop_value in page.get("properties", {}).items():
+            extractor = extractors_get(prop_value.get("type"))
+            page_data[keys_get(prop_name, prop_name)] = extractor(prop_value) if extractor else None
+
+        return page_data
+
+    async def _property_ids(self, database_id: str, names: List[str]) -> Optional[List[str]]:
+        """
+        将属性名翻译为线上属性ID（filter_properties投影用）
+
+        Args:
+            database_id: 数据库ID
+            names: 属性名列表
+
+        Returns:
+            Optional[List[str]]: 属性ID列表，无法解析时返回None（放弃投影）
+        """
+        cached = self._schema_cache.get(database_id)
+        if not (cached and cached[0] > time.monotonic()):
+            try:
+                await self._fetch_schema(database_id)
+            except Exception as e:
+                logger.debug(f"获取属性ID失败: {e}")
+                return None
+            cached = self._schema_cache.get(database_id)
+
+        live_schema = cached[1]
+        ids = [
+            live_schema[name]["id"]
+            for name in names
+            if name in live_schema and "id" in live_schema[name]
+        ]
+        return ids or None
+
+    async def iter_database(
+        self,
+        database_name: str,
+        filter_condition: Optional[Dict] = None,
+        sorts: Optional[List[Dict]] = None,
+        limit: Optional[int] = None,
+        properties: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式查询数据库，逐条产出解析后的记录
+        按页拉取，不在内存中累积完整结果集
+
+        Args:
+            database_name: 数据库名称
+            filter_condition: 过滤条件
+            sorts: 排序条件
+            limit: 结果限制数量
+            properties: 只返回这些属性（服务端投影，缩小响应体）
+
+        Yields:
+            Dict: 解析后的记录
+        """
+        database_id = self.databases.get(database_name)
+        if not database_id:
+            logger.error(f"数据库 '{database_name}' 未配置")
+            return
+
+        query_params = {
+            "database_id": database_id
+        }
+
+        if filter_condition:
+            query_params["filter"] = filter_condition
+        if sorts:
+            query_params["sorts"] = sorts
+        if limit:
+            query_params["page_size"] = min(limit, 100)  # Notion API限制
+        if properties:
+            prop_ids = await self._property_ids(database_id, properties)
+            if prop_ids:
+                query_params["filter_properties"] = prop_ids
+
+        yielded = 0
+        next_task = None
+        try:
+            while True:
+                if next_task is None:
+                    response = await self._call(self.client.databases.query, **query_params)
+                else:
+                    response = await next_task
+                    next_task = None
+
+                # 边解析当前页边预取下一页，流水线化分页往返
+                if response.get("has_more"):
+                    next_params = dict(query_params, start_cursor=response.get("next_cursor"))
+                    next_task = asyncio.create_task(
+                        self._call(self.client.databases.query, **next_params)
+                    )
+
+                for page in response.get("results", []):
+                    yield self._parse_page(page)
+                    yielded += 1
+                    if limit and yielded >= limit:
+                        return
+
+                if next_task is None:
+                    return
+        finally:
+            # 消费方中途break也要取消在途预取，避免白费请求和未取回的异常
+            if next_task is not None:
+                next_task.cancel()
+
     async def query_database(
         self, 
         database_name: str, 
         filter_condition: Optional[Dict] = None,
         sorts: Optional[List[Dict]] = None,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        properties: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
-        查询数据库
+        查询数据库（物化版本，内部走iter_database）
         
         Args:
             database_name: 数据库名称
             filter_condition: 过滤条件
             sorts: 排序条件
             limit: 结果限制数量
+            properties: 只返回这些属性（服务端投影）
             
         Returns:
             List[Dict]: 查询结果
         """
         try:
-            database_id = self.databases.get(database_name)
-            if not database_id:
-                logger.error(f"数据库 '{database_name}' 未配置")
-                return []
-            
-            query_params = {
-                "database_id": database_id
-            }
-            
-            if filter_condition:
-                query_params["filter"] = filter_condition
-            if sorts:
-                query_params["sorts"] = sorts
-            if limit:
-                query_params["page_size"] = min(limit, 100)  # Notion API限制
-            
-            # 执行查询
-            if limit and limit <= 100:
-                response = self.client.databases.query(**query_params)
-                results = response.get("results", [])
-            else:
-                # 使用分页收集所有结果
-                results = collect_paginated_api(
-                    self.client.databases.query,
-                    **query_params
+            # 过滤条件含当前时刻时间戳时每次键都不同，探测+缓存只会白费一次往返
+            cacheable = not self._volatile_filter(filter_condition)
+
+            stamp = ""
+            cache_key = None
+            if cacheable:
+                # 条件缓存：先以一次page_size=1探测最新编辑时间，未变化则复用缓存
+                cache_key = (database_name, repr(filter_condition), repr(sorts), limit, repr(properties))
+                stamp = await self._latest_edit_stamp(database_name, filter_condition)
+
+                cached = self._query_cache.get(cache_key)
+                if stamp and cached and cached[0] == stamp \
+                        and time.monotonic() - cached[1] < self.QUERY_CACHE_TTL:
+                    self._query_cache.move_to_end(cache_key)
+                    logger.debug(f"查询数据库 '{database_name}' 命中缓存")
+                    return list(cached[2])
+
+            parsed_results = [
+                page async for page in self.iter_database(
+                    database_name, filter_condition, sorts, limit, properties
                 )
-            
-            # 解析结果
-            parsed_results = []
-            for page in results:
-                page_data = {
-                    "id": page.get("id"),
-                    "created_time": page.get("created_time"),
-                    "last_edited_time": page.get("last_edited_time"),
-                    "url": page.get("url")
-                }
-                
-                # 解析属性
-                properties = page.get("properties", {})
-                for prop_name, prop_value in properties.items():
-                    page_data[prop_name] = self._extract_property_value(prop_value)
-                
-                parsed_results.append(page_data)
-            
+            ]
+
+            if cacheable and stamp:
+                self._query_cache[cache_key] = (stamp, time.monotonic(), parsed_results)
+                self._query_cache.move_to_end(cache_key)
+                while len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+
             logger.info(f"查询数据库 '{database_name}' 成功，返回 {len(parsed_results)} 条记录")
-            return parsed_results
-            
+            return list(parsed_results)
+
         except Exception as e:
             logger.error(f"查询数据库失败: {e}")
             return []
+
+    @classmethod
+    def _volatile_filter(cls, condition: Any) -> bool:
+        """
+        判断过滤条件是否包含带时刻精度的日期值
+        这类条件（如now().isoformat()）每次调用都不同，缓存永远不会命中
+
+        Args:
+            condition: 过滤条件（dict/list/标量）
+
+        Returns:
+            bool: 是否包含易变时间戳
+        """
+        if isinstance(condition, dict):
+            date_cond = condition.get("date")
+            if isinstance(date_cond, dict):
+                for value in date_cond.values():
+                    # 纯日期和补零到午夜的值是稳定的，其余时刻值视为易变
+                    if isinstance(value, str) and len(value) > 10 \
+                            and not value.endswith("T00:00:00.000Z"):
+                        return True
+            return any(
+                cls._volatile_filter(v)
+                for v in condition.values()
+                if isinstance(v, (dict, list))
+            )
+        if isinstance(condition, list):
+            return any(cls._volatile_filter(item) for item in condition)
+        return False
+
+    def _invalidate_query_cache(self) -> None:
+        """写操作成功后清空查询缓存，归档的页面不会再触发编辑时间探测"""
+        self._query_cache.clear()
     
-    async def update_page(self, page_id: str, properties: Dict[str, Any]) -> bool:
+    async def _latest_edit_stamp(
+        self,
+        database_name: str,
+        filter_condition: Optional[Dict] = None
+    ) -> str:
+        """
+        读取数据库（过滤范围内）最新的last_edited_time
+
+        Args:
+            database_name: 数据库名称
+            filter_condition: 过滤条件
+
+        Returns:
+            str: 最新编辑时间戳，失败时返回空串（视为缓存失效）
+        """
+        database_id = self.databases.get(database_name)
+        if not database_id:
+            return ""
+
+        try:
+            probe_params = {
+                "database_id": database_id,
+                "page_size": 1,
+                "sorts": [{"timestamp": "last_edited_time", "direction": "descending"}],
+            }
+            if filter_condition:
+                probe_params["filter"] = filter_condition
+
+            response = await self._call(self.client.databases.query, **probe_params)
+            results = response.get("results", [])
+            return results[0].get("last_edited_time", "") if results else ""
+        except Exception as e:
+            logger.debug(f"查询编辑时间探测失败: {e}")
+            return ""
+
+    async def update_page(
+        self,
+        page_id: str,
+        properties: Dict[str, Any],
+        database_name: Optional[str] = None
+    ) -> bool:
         """
         更新页面属性
-        
+        调用方传入database_name时跳过pages.retrieve，直接用缓存架构更新
+
         Args:
             page_id: 页面ID
             properties: 要更新的属性
-            
+            database_name: 页面所属数据库名称（可选，已知时省2次往返）
+
         Returns:
             bool: 更新是否成功
         """
         try:
-            # 先获取页面信息来确定属性类型
-            page_info = self.client.pages.retrieve(page_id=page_id)
-            parent = page_info.get("parent", {})
-            
-            if parent.get("type") == "database_id":
-                database_id = parent.get("database_id")
-                database_info = self.client.databases.retrieve(database_id=database_id)
-                db_properties = database_info.get("properties", {})
-                
-                # 格式化属性
-                formatted_properties = {}
-                for prop_name, prop_value in properties.items():
-                    if prop_name in db_properties:
-                        prop_type = db_properties[prop_name].get("type")
-                        formatted_properties[prop_name] = self._format_property_value(prop_type, prop_value)
-                
-                # 更新页面
-                self.client.pages.update(
-                    page_id=page_id,
-                    properties=formatted_properties
-                )
-                
-                logger.info(f"更新页面成功: {page_id}")
-                return True
+            if database_name:
+                database_id = self.databases.get(database_name)
+                if not database_id:
+                    logger.error(f"数据库 '{database_name}' 未配置")
+                    return False
             else:
-                logger.error(f"页面 {page_id} 不在数据库中")
-                return False
+                # 先获取页面信息来确定所属数据库
+                page_info = await self._call(self.client.pages.retrieve, page_id=page_id)
+                parent = page_info.get("parent", {})
+
+                if parent.get("type") != "database_id":
+                    logger.error(f"页面 {page_id} 不在数据库中")
+                    return False
+                database_id = parent.get("database_id")
+
+            db_properties = await self._get_db_schema(database_id)
+
+            # 格式化属性
+            formatted_properties = {}
+            for prop_name, prop_value in properties.items():
+                if prop_name in db_properties:
+                    prop_type = db_properties[prop_name].get("type")
+                    formatted_properties[prop_name] = self._format_property_value(prop_type, prop_value)
+
+            # 更新页面
+            await self._call(
+                self.client.pages.update,
+                page_id=page_id,
+                properties=formatted_properties
+            )
+
+            self._invalidate_query_cache()
+            logger.info(f"更新页面成功: {page_id}")
+            return True
                 
         except Exception as e:
             logger.error(f"更新页面失败: {e}")
@@ -309,10 +759,12 @@ class NotionClient:
             bool: 删除是否成功
         """
         try:
-            self.client.pages.update(
+            await self._call(
+                self.client.pages.update,
                 page_id=page_id,
                 archived=True
             )
+            self._invalidate_query_cache()
             logger.info(f"归档页面成功: {page_id}")
             return True
         except Exception as e:
@@ -425,4 +877,21 @@ class NotionClient:
         if due_date:
             properties["截止日期"] = due_date
         
-        return await self.create_page("todos", properties) 
\ No newline at end of file
+        return await self.create_page("todos", properties) 
+
+
+# 模块级单例：各任务共享同一客户端，复用连接池与架构缓存
+_default_client: Optional[NotionClient] = None
+
+
+def get_notion_client() -> NotionClient:
+    """
+    获取共享的NotionClient实例（默认令牌）
+
+    Returns:
+        NotionClient: 共享客户端实例
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = NotionClient()
+    return _default_client
@@ -3,19 +3,106 @@
 处理收入和支出记录
 """
 
-from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+from loguru import logger
+
 from .base_task import BaseTask, TaskResult
-from ..storage.notion_client import NotionClient
+from ..storage.notion_client import get_notion_client
 from ..config.settings import settings
 
+# 静态排序条件与过滤器模板（模块级，避免每次查询重建）
+_SORTS_DATE_DESC = ({"property": "日期", "direction": "descending"},)
+
+
+def _type_filter(value):
+    """按类型的select过滤条件"""
+    return {"property": "类型", "select": {"equals": value}}
+
+
+def _category_filter(value):
+    """按分类的select过滤条件"""
+    return {"property": "分类", "select": {"equals": value}}
+
+
+# (filters键, 过滤器构造函数) 映射
+_SELECT_FILTERS = (
+    ("type", _type_filter),
+    ("category", _category_filter),
+)
+
+# 统计结果缓存有效期（秒）
+_STATS_CACHE_TTL = 60
+
+
+@dataclass(slots=True)
+class AccountingRecord:
+    """紧凑的记账记录视图（批量处理时替代每行dict）"""
+    id: str
+    title: str
+    amount: float
+    type: str
+    category: str
+    date: Optional[str]
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "AccountingRecord":
+        """
+        从查询返回的记录dict构建
+
+        Args:
+            record: query_database解析出的记录
+
+        Returns:
+            AccountingRecord: 紧凑记录
+        """
+        return cls(
+            id=record.get("id", ""),
+            title=record.get("标题", ""),
+            amount=record.get("金额", 0.0),
+            type=record.get("类型", "支出"),
+            category=record.get("分类", "其他"),
+            date=record.get("日期"),
+        )
+
+
+@lru_cache(maxsize=8)
+def _period_range(period: str, today: date) -> Tuple[Optional[str], Optional[str]]:
+    """
+    计算统计周期的日期范围（按当天记忆化）
+
+    Args:
+        period: 统计周期 (本月/本年/全部)
+        today: 当天日期，作为缓存键
+
+    Returns:
+        Tuple: (date_from, date_to)，全部周期返回(None, None)
+    """
+    if period == "本月":
+        date_from = f"{today.year}-{today.month:02d}-01"
+        if today.month == 12:
+            date_to = f"{today.year + 1}-01-01"
+        else:
+            date_to = f"{today.year}-{today.month + 1:02d}-01"
+        return date_from, date_to
+    elif period == "本年":
+        return f"{today.year}-01-01", f"{today.year + 1}-01-01"
+    return None, None
+
 
 class AccountingTask(BaseTask):
     """记账任务类"""
     
     def __init__(self):
         super().__init__("记账")
-        self.notion_client = NotionClient()
+        self.notion_client = get_notion_client()
+        # 统计结果短TTL缓存: period -> (过期时间戳, TaskResult)
+        self._stats_cache: Dict[str, Tuple[float, TaskResult]] = {}
     
     async def execute(self, data: Dict[str, Any]) -> TaskResult:
         """
@@ -29,16 +116,7 @@ class AccountingTask(BaseTask):
         """
         try:
             # 解析日期
-            date_str = data.get('date')
-            if isinstance(date_str, str):
-                try:
-                    date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                except ValueError:
-                    # 尝试解析简单的日期格式
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                    date = date.replace(tzinfo=timezone.utc)
-            else:
-                date = datetime.now(timezone.utc)
+            date = self._parse_entry_date(data.get('date'))
             
             # 创建记账记录
             page_id = await self.notion_client.add_accounting_entry(
@@ -51,6 +129,8 @@ class AccountingTask(BaseTask):
             )
             
             if page_id:
+                # 新记录写入，统计缓存失效
+                self._stats_cache.clear()
                 return TaskResult(
                     success=True,
                     data={
@@ -76,6 +156,85 @@ class AccountingTask(BaseTask):
                 message="记账过程中出现错误"
             )
     
+    @staticmethod
+    def _parse_entry_date(date_str: Any) -> datetime:
+        """
+        解析记账日期，无效或缺失时取当前UTC时间
+
+        Args:
+            date_str: 日期字符串或None
+
+        Returns:
+            datetime: 带时区的日期
+        """
+        if isinstance(date_str, str):
+            try:
+                # 3.11+的fromisoformat已支持'Z'，优先不做replace分配
+                date = datetime.fromisoformat(date_str)
+            except ValueError:
+                try:
+                    date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+                except ValueError:
+                    # 尝试解析简单的日期格式
+                    date = datetime.strptime(date_str, '%Y-%m-%d')
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            return date
+        return datetime.now(timezone.utc)
+
+    async def execute_many(self, data_list: List[Dict[str, Any]]) -> TaskResult:
+        """
+        批量执行记账任务（架构取一次，创建并发提交）
+
+        Args:
+            data_list: 记账数据列表
+
+        Returns:
+            TaskResult: 批量执行结果
+        """
+        try:
+            if not data_list:
+                return TaskResult(
+                    success=True,
+                    data={"created_count": 0, "page_ids": []},
+                    message="没有需要创建的记账记录"
+                )
+
+            properties_list = [
+                {
+                    "标题": data.get('title', '未知支出'),
+                    "金额": float(data.get('amount', 0.0)),
+                    "分类": data.get('category', '其他'),
+                    "日期": self._parse_entry_date(data.get('date')),
+                    "描述": data.get('description', ''),
+                    "类型": data.get('type', '支出')
+                }
+                for data in data_list
+            ]
+
+            page_ids = await self.notion_client.create_pages("accounting", properties_list)
+            created_count = sum(1 for pid in page_ids if pid)
+            if created_count:
+                self._stats_cache.clear()
+            failed_count = len(page_ids) - created_count
+
+            return TaskResult(
+                success=failed_count == 0,
+                data={
+                    "created_count": created_count,
+                    "failed_count": failed_count,
+                    "page_ids": page_ids
+                },
+                message=f"批量记账完成：{created_count} 条成功，{failed_count} 条失败"
+            )
+
+        except Exception as e:
+            return TaskResult(
+                success=False,
+                error=str(e),
+                message="批量记账过程中出现错误"
+            )
+
     async def validate_data(self, data: Dict[str, Any]) -> bool:
         """
         验证记账数据
@@ -88,27 +247,61 @@ class AccountingTask(BaseTask):
         """
         # 检查必填字段
         if not data.get('title'):
-            self.logger.error("缺少记账标题")
+            logger.error("缺少记账标题")
             return False
         
         # 检查金额
         try:
             amount = float(data.get('amount', 0))
             if amount <= 0:
-                self.logger.error("金额必须大于0")
+                logger.error("金额必须大于0")
                 return False
         except (ValueError, TypeError):
-            self.logger.error("金额格式不正确")
+            logger.error("金额格式不正确")
             return False
         
         # 检查类型
         type_ = data.get('type', '支出')
         if type_ not in ['收入', '支出']:
-            self.logger.warning(f"未知的记账类型: {type_}，将默认为支出")
+            logger.warning(f"未知的记账类型: {type_}，将默认为支出")
             data['type'] = '支出'
         
         return True
     
+    def _build_filter_condition(self, filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        根据查询参数构建Notion过滤条件
+
+        Args:
+            filters: 查询过滤条件
+
+        Returns:
+            Optional[Dict]: Notion过滤条件，无条件时返回None
+        """
+        if not filters:
+            return None
+
+        filter_parts = [
+            build(filters[key])
+            for key, build in _SELECT_FILTERS
+            if key in filters
+        ]
+
+        # 按日期范围过滤
+        if 'date_from' in filters or 'date_to' in filters:
+            date_filter = {"property": "日期", "date": {}}
+            if 'date_from' in filters:
+                date_filter["date"]["on_or_after"] = filters['date_from']
+            if 'date_to' in filters:
+                date_filter["date"]["on_or_before"] = filters['date_to']
+            filter_parts.append(date_filter)
+
+        if len(filter_parts) == 1:
+            return filter_parts[0]
+        elif len(filter_parts) > 1:
+            return {"and": filter_parts}
+        return None
+
     async def query(self, filters: Optional[Dict[str, Any]] = None) -> TaskResult:
         """
         查询记账记录
@@ -120,40 +313,8 @@ class AccountingTask(BaseTask):
             TaskResult: 查询结果
         """
         try:
-            filter_condition = None
-            sorts = [{"property": "日期", "direction": "descending"}]
-            
-            if filters:
-                filter_parts = []
-                
-                # 按类型过滤
-                if 'type' in filters:
-                    filter_parts.append({
-                        "property": "类型",
-                        "select": {"equals": filters['type']}
-                    })
-                
-                # 按分类过滤
-                if 'category' in filters:
-                    filter_parts.append({
-                        "property": "分类",
-                        "select": {"equals": filters['category']}
-                    })
-                
-                # 按日期范围过滤
-                if 'date_from' in filters or 'date_to' in filters:
-                    date_filter = {"property": "日期", "date": {}}
-                    if 'date_from' in filters:
-                        date_filter["date"]["on_or_after"] = filters['date_from']
-                    if 'date_to' in filters:
-                        date_filter["date"]["on_or_before"] = filters['date_to']
-                    filter_parts.append(date_filter)
-                
-                # 组合过滤条件
-                if len(filter_parts) == 1:
-                    filter_condition = filter_parts[0]
-                elif len(filter_parts) > 1:
-                    filter_condition = {"and": filter_parts}
+            filter_condition = self._build_filter_condition(filters)
+            sorts = list(_SORTS_DATE_DESC)
             
             # 执行查询
             results = await self.notion_client.query_database(
@@ -184,34 +345,35 @@ class AccountingTask(BaseTask):
             TaskResult: 删除结果
         """
         try:
-            # 先查询所有记账记录
-            all_records = await self.notion_client.query_database(
-                database_name="accounting",
-                filter_condition=None,
-                sorts=None,
-                limit=None  # 获取所有记录
-            )
-            
-            if not all_records:
+            # 并发删除，信号量对齐Notion限速；记录流式到达即派发删除
+            sem = asyncio.Semaphore(3)
+
+            async def _delete_one(page_id: str) -> bool:
+                async with sem:
+                    return await self.notion_client.delete_page(page_id)
+
+            delete_tasks = []
+            async for record in self.notion_client.iter_database("accounting"):
+                page_id = record.get("id")
+                if page_id:
+                    delete_tasks.append(asyncio.ensure_future(_delete_one(page_id)))
+
+            if not delete_tasks:
                 return TaskResult(
                     success=True,
                     data={"deleted_count": 0},
                     message="没有记账记录需要删除"
                 )
-            
-            # 删除所有记录
-            deleted_count = 0
-            failed_count = 0
-            
-            for record in all_records:
-                page_id = record.get("id")
-                if page_id:
-                    success = await self.notion_client.delete_page(page_id)
-                    if success:
-                        deleted_count += 1
-                    else:
-                        failed_count += 1
-            
+
+            results = await asyncio.gather(*delete_tasks, return_exceptions=True)
+            deleted_count = sum(1 for r in results if r is True)
+            failed_count = len(results) - deleted_count
+
+            # 删除成功后统计缓存已失效，与execute/execute_many保持一致
+            if deleted_count:
+                self._stats_cache.clear()
+
+
             if failed_count == 0:
                 return TaskResult(
                     success=True,
@@ -226,7 +388,7 @@ class AccountingTask(BaseTask):
                 )
             
         except Exception as e:
-            self.logger.error(f"删除所有记账记录失败: {e}")
+            logger.error(f"删除所有记账记录失败: {e}")
             return TaskResult(
                 success=False,
                 error=str(e),
@@ -281,62 +443,58 @@ class AccountingTask(BaseTask):
             TaskResult: 统计结果
         """
         try:
-            # 根据周期设置过滤条件
+            # 短TTL缓存：仪表盘式轮询直接命中内存
+            cached = self._stats_cache.get(period)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+            # 根据周期设置过滤条件（按当天记忆化）
             filters = {}
-            if period == "本月":
-                now = datetime.now()
-                filters['date_from'] = f"{now.year}-{now.month:02d}-01"
-                if now.month == 12:
-                    filters['date_to'] = f"{now.year + 1}-01-01"
-                else:
-                    filters['date_to'] = f"{now.year}-{now.month + 1:02d}-01"
-            elif period == "本年":
-                now = datetime.now()
-                filters['date_from'] = f"{now.year}-01-01"
-                filters['date_to'] = f"{now.year + 1}-01-01"
+            date_from, date_to = _period_range(period, date.today())
+            if date_from:
+                filters['date_from'] = date_from
+                filters['date_to'] = date_to
             
-            # 查询所有记录
-            query_result = await self.query(filters)
-            
-            if not query_result.success:
-                return query_result
-            
-            records = query_result.data.get('records', [])
-            
-            # 计算统计信息
+            # 单次流式遍历聚合，不物化中间记录列表
+            filter_condition = self._build_filter_condition(filters)
+
             total_income = 0.0
             total_expense = 0.0
-            category_stats = {}
-            
-            for record in records:
-                amount = record.get('金额', 0) or 0
+            record_count = 0
+            category_stats = defaultdict(lambda: {'收入': 0.0, '支出': 0.0})
+
+            async for record in self.notion_client.iter_database(
+                "accounting", filter_condition,
+                properties=["金额", "类型", "分类"]
+            ):
+                amount = record.get('金额', 0.0)
                 record_type = record.get('类型', '支出')
                 category = record.get('分类', '其他')
-                
+
                 if record_type == '收入':
                     total_income += amount
                 else:
                     total_expense += amount
-                
-                # 分类统计
-                if category not in category_stats:
-                    category_stats[category] = {'收入': 0.0, '支出': 0.0}
+
                 category_stats[category][record_type] += amount
-            
+                record_count += 1
+
             stats = {
                 'period': period,
                 'total_income': total_income,
                 'total_expense': total_expense,
                 'net_amount': total_income - total_expense,
-                'record_count': len(records),
-                'category_stats': category_stats
+                'record_count': record_count,
+                'category_stats': dict(category_stats)
             }
             
-            return TaskResult(
+            result = TaskResult(
                 success=True,
                 data=stats,
                 message=f"{period}统计：收入 {total_income}元，支出 {total_expense}元，净额 {total_income - total_expense}元"
             )
+            self._stats_cache[period] = (time.monotonic() + _STATS_CACHE_TTL, result)
+            return result
             
         except Exception as e:
             return TaskResult(
@@ -3,15 +3,25 @@
 定义所有任务的通用接口和行为
 """
 
+import json
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
 from loguru import logger
 
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时走stdlib json
+    orjson = None
+
 
 class TaskResult:
     """任务执行结果"""
-    
+
+    # 每次任务调用都会分配，slots省去实例__dict__
+    __slots__ = ("success", "data", "message", "error", "_ts_ns")
+
     def __init__(
         self, 
         success: bool, 
@@ -23,8 +33,19 @@ class TaskResult:
         self.data = data or {}
         self.message = message
         self.error = error
-        self.timestamp = datetime.now(timezone.utc)
-    
+        # 只记纳秒整数，datetime对象在真正读取timestamp时才构造
+        self._ts_ns = time.time_ns()
+
+    @property
+    def ts_ns(self) -> int:
+        """结果创建时间（纳秒整数，适合比较/求差）"""
+        return self._ts_ns
+
+    @property
+    def timestamp(self) -> datetime:
+        """结果创建时间（惰性构造datetime）"""
+        return datetime.fromtimestamp(self._ts_ns / 1e9, tz=timezone.utc)
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
@@ -35,6 +56,24 @@ class TaskResult:
             "timestamp": self.timestamp.isoformat()
         }
 
+    def to_json(self) -> bytes:
+        """
+        序列化为JSON字节串
+        有orjson时直接编码datetime，省去isoformat中间字符串
+
+        Returns:
+            bytes: JSON字节串
+        """
+        if orjson is not None:
+            return orjson.dumps({
+                "success": self.success,
+                "data": self.data,
+                "message": self.message,
+                "error": self.error,
+                "timestamp": self.timestamp
+            })
+        return json.dumps(self.to_dict(), ensure_ascii=False).encode()
+
 
 class BaseTask(ABC):
     """
@@ -51,7 +90,6 @@ class BaseTask(ABC):
         """
         self.name = name
         self.created_at = datetime.now(timezone.utc)
-        self.logger = logger.bind(task=name)
     
     @abstractmethod
     async def execute(self, data: Dict[str, Any]) -> TaskResult:
@@ -163,6 +201,21 @@ class BaseTask(ABC):
         """
         return f"任务类型: {self.name}"
     
+    async def validate_and_format(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        验证并格式化数据（单入口）
+        默认实现串联validate_data和format_data；子类可重写为单次遍历
+
+        Args:
+            data: 原始数据
+
+        Returns:
+            Optional[Dict]: 格式化后的数据，验证失败返回None
+        """
+        if not await self.validate_data(data):
+            return None
+        return self.format_data(data)
+
     def format_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         格式化任务数据
@@ -173,27 +226,27 @@ class BaseTask(ABC):
         Returns:
             Dict[str, Any]: 格式化后的数据
         """
-        # 默认实现：移除空值和None值
-        formatted_data = {}
-        for key, value in data.items():
-            if value is not None and value != "":
-                formatted_data[key] = value
-        return formatted_data
+        # 默认实现：移除空值和None值（dict推导预估容量，C层过滤）
+        return {
+            key: value for key, value in data.items()
+            if value is not None and value != ""
+        }
     
     def log_task_start(self, data: Dict[str, Any]) -> None:
         """记录任务开始日志"""
-        self.logger.info(f"开始执行任务: {self.name}")
-        self.logger.debug(f"任务数据: {data}")
+        logger.info("开始执行任务: {}", self.name)
+        # lazy=True：debug被抑制时完全跳过data的repr构建
+        logger.opt(lazy=True).debug("任务数据: {}", lambda: data)
     
     def log_task_success(self, result: TaskResult) -> None:
         """记录任务成功日志"""
-        self.logger.info(f"任务执行成功: {self.name}")
+        logger.info("任务执行成功: {}", self.name)
         if result.message:
-            self.logger.info(f"执行结果: {result.message}")
+            logger.info("执行结果: {}", result.message)
     
     def log_task_error(self, error: str) -> None:
         """记录任务错误日志"""
-        self.logger.error(f"任务执行失败: {self.name}, 错误: {error}")
+        logger.error("任务执行失败: {}, 错误: {}", self.name, error)
     
     async def safe_execute(self, data: Dict[str, Any]) -> TaskResult:
         """
@@ -205,46 +258,52 @@ class BaseTask(ABC):
         Returns:
             TaskResult: 任务执行结果
         """
-        try:
-            self.log_task_start(data)
-            
-            # 验证数据
-            if not await self.validate_data(data):
-                error_msg = "任务数据验证失败"
-                self.log_task_error(error_msg)
+        # contextualize基于contextvars注入任务名，避免bind分配新Logger对象
+        # 错误日志入口绑定为局部变量，热路径少两级属性查找
+        log_error = self.log_task_error
+        with logger.contextualize(task=self.name):
+            try:
+                self.log_task_start(data)
+
+                # 验证并格式化数据（单次遍历）
+                formatted_data = await self.validate_and_format(data)
+                if formatted_data is None:
+                    error_msg = "任务数据验证失败"
+                    log_error(error_msg)
+                    return TaskResult(
+                        success=False,
+                        error=error_msg,
+                        message="请检查输入数据的格式和完整性"
+                    )
+
+                # 执行任务
+                result = await self.execute(formatted_data)
+
+                if result.success:
+                    self.log_task_success(result)
+                else:
+                    log_error(result.error or "任务执行失败")
+
+                return result
+
+            except Exception as e:
+                error_msg = f"任务执行出现异常: {str(e)}"
+                log_error(error_msg)
                 return TaskResult(
                     success=False,
                     error=error_msg,
-                    message="请检查输入数据的格式和完整性"
+                    message="任务执行过程中出现了意外错误"
                 )
-            
-            # 格式化数据
-            formatted_data = self.format_data(data)
-            
-            # 执行任务
-            result = await self.execute(formatted_data)
-            
-            if result.success:
-                self.log_task_success(result)
-            else:
-                self.log_task_error(result.error or "任务执行失败")
-            
-            return result
-            
-        except Exception as e:
-            error_msg = f"任务执行出现异常: {str(e)}"
-            self.log_task_error(error_msg)
-            return TaskResult(
-                success=False,
-                error=error_msg,
-                message="任务执行过程中出现了意外错误"
-            )
 
 
 class TaskFactory:
     """任务工厂类"""
     
     _task_classes = {}
+    # 任务元信息缓存：静态数据，首次构建后复用
+    _info_cache: Dict[str, Dict[str, Any]] = {}
+    # 任务实例缓存：任务类在execute调用间无状态，可安全复用
+    _task_instances: Dict[str, "BaseTask"] = {}
     
     @classmethod
     def register_task(cls, task_type: str, task_class: type):
@@ -256,6 +315,8 @@ class TaskFactory:
             task_class: 任务类
         """
         cls._task_classes[task_type] = task_class
+        cls._info_cache.pop(task_type, None)
+        cls._task_instances.pop(task_type, None)
         logger.info(f"注册任务类型: {task_type}")
     
     @classmethod
@@ -269,13 +330,24 @@ class TaskFactory:
         Returns:
             Optional[BaseTask]: 任务实例，如果类型不存在则返回None
         """
+        instance = cls._task_instances.get(task_type)
+        if instance is not None:
+            return instance
+
         if task_type in cls._task_classes:
-            task_class = cls._task_classes[task_type]
-            return task_class()
+            instance = cls._task_classes[task_type]()
+            cls._task_instances[task_type] = instance
+            return instance
         else:
             logger.error(f"未知的任务类型: {task_type}")
             return None
     
+    @classmethod
+    def clear_cache(cls):
+        """清空实例与元信息缓存（测试或热重载用）"""
+        cls._task_instances.clear()
+        cls._info_cache.clear()
+
     @classmethod
     def get_available_task_types(cls) -> List[str]:
         """
@@ -297,13 +369,17 @@ class TaskFactory:
         Returns:
             Optional[Dict]: 任务信息，包括必填字段、可选字段和描述
         """
-        if task_type in cls._task_classes:
-            task_class = cls._task_classes[task_type]
-            task_instance = task_class()
-            return {
+        info = cls._info_cache.get(task_type)
+        if info is None:
+            if task_type not in cls._task_classes:
+                return None
+            task_instance = cls._task_classes[task_type]()
+            info = {
                 "name": task_instance.name,
                 "description": task_instance.get_task_description(),
                 "required_fields": task_instance.get_required_fields(),
                 "optional_fields": task_instance.get_optional_fields()
             }
-        return None 
\ No newline at end of file
+            cls._info_cache[task_type] = info
+        # 返回浅拷贝，防止调用方修改缓存
+        return dict(info) 
\ No newline at end of file
@@ -3,19 +3,50 @@
 处理订阅服务的记录和管理
 """
 
+import asyncio
+import re
+from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any, Optional
+from loguru import logger
+
 from .base_task import BaseTask, TaskResult
-from ..storage.notion_client import NotionClient
+from ..storage.notion_client import get_notion_client
 from ..config.settings import settings
 
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，缺失时走纯Python聚合
+    np = None
+
+# ISO日期/时间格式预检（正则先验证，失败路径不再走异常展开）
+_ISO_RE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+\-]\d{2}:?\d{2})?)?$'
+)
+
+# 各计费周期折算为月度成本的系数（一个月约4.33周）
+_MONTHLY_FACTOR = {'周': 4.33, '月': 1.0, '年': 1.0 / 12.0}
+
+# 静态排序条件与select过滤字段映射（模块级，免去每次查询重建）
+_SORTS = ({"property": "下次计费", "direction": "ascending"},)
+_SELECT_FIELDS = {
+    "status": "状态",
+    "category": "分类",
+    "billing_cycle": "计费周期",
+}
+
 
 class SubscriptionTask(BaseTask):
     """订阅管理任务类"""
-    
+
+    # 字段与合法周期的类级常量：调用方只读，无需每次重建列表
+    REQUIRED_FIELDS = ('name', 'price', 'billing_cycle')
+    OPTIONAL_FIELDS = ('category', 'description', 'next_billing_date')
+    _VALID_CYCLES = frozenset({'周', '月', '年'})
+
     def __init__(self):
         super().__init__("订阅管理")
-        self.notion_client = NotionClient()
+        self.notion_client = get_notion_client()
     
     async def execute(self, data: Dict[str, Any]) -> TaskResult:
         """
@@ -71,30 +102,37 @@ class SubscriptionTask(BaseTask):
                 message="订阅记录过程中出现错误"
             )
     
-    def _calculate_next_billing(self, billing_cycle: str, next_billing_date: Optional[str] = None) -> datetime:
+    def _calculate_next_billing(
+        self,
+        billing_cycle: str,
+        next_billing_date: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> datetime:
         """
         计算下次计费日期
         
         Args:
             billing_cycle: 计费周期
             next_billing_date: 指定的下次计费日期
+            now: 当前时间，不传时在需要时才获取
             
         Returns:
             datetime: 下次计费日期
         """
-        if next_billing_date:
+        if isinstance(next_billing_date, datetime):
+            return next_billing_date.replace(tzinfo=timezone.utc)
+        if isinstance(next_billing_date, str) and _ISO_RE.match(next_billing_date):
+            # 正则只校验形状，2024-02-30这类历法非法值仍会抛ValueError，
+            # 此时退回按计费周期计算（与原有行为一致）
             try:
-                # 尝试解析提供的日期
-                if isinstance(next_billing_date, str):
-                    date = datetime.fromisoformat(next_billing_date.replace('Z', '+00:00'))
-                else:
-                    date = next_billing_date
+                date = datetime.fromisoformat(next_billing_date.replace('Z', '+00:00'))
                 return date.replace(tzinfo=timezone.utc)
-            except (ValueError, AttributeError):
+            except ValueError:
                 pass
         
-        # 根据计费周期计算
-        now = datetime.now(timezone.utc)
+        # 根据计费周期计算（只有走到这里才需要当前时间）
+        if now is None:
+            now = datetime.now(timezone.utc)
         
         if billing_cycle == "周":
             return now + timedelta(weeks=1)
@@ -130,27 +168,66 @@ class SubscriptionTask(BaseTask):
         """
         # 检查必填字段
         if not data.get('name'):
-            self.logger.error("缺少订阅名称")
+            logger.error("缺少订阅名称")
             return False
         
         # 检查价格
         try:
             price = float(data.get('price', 0))
             if price < 0:
-                self.logger.error("价格不能为负数")
+                logger.error("价格不能为负数")
                 return False
         except (ValueError, TypeError):
-            self.logger.error("价格格式不正确")
+            logger.error("价格格式不正确")
             return False
         
         # 检查计费周期
         billing_cycle = data.get('billing_cycle', '月')
-        if billing_cycle not in ['周', '月', '年']:
-            self.logger.warning(f"未知的计费周期: {billing_cycle}，将默认为月")
+        if billing_cycle not in self._VALID_CYCLES:
+            logger.warning(f"未知的计费周期: {billing_cycle}，将默认为月")
             data['billing_cycle'] = '月'
         
         return True
     
+    async def validate_and_format(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        单次遍历完成验证与归一化（价格只做一次float转换）
+
+        Args:
+            data: 原始数据
+
+        Returns:
+            Optional[Dict]: 格式化后的数据，验证失败返回None
+        """
+        if not data.get('name'):
+            logger.error("缺少订阅名称")
+            return None
+
+        try:
+            price = float(data.get('price', 0))
+        except (ValueError, TypeError):
+            logger.error("价格格式不正确")
+            return None
+        if price < 0:
+            logger.error("价格不能为负数")
+            return None
+
+        billing_cycle = data.get('billing_cycle', '月')
+        if billing_cycle not in self._VALID_CYCLES:
+            logger.warning(f"未知的计费周期: {billing_cycle}，将默认为月")
+            billing_cycle = '月'
+
+        formatted_data = {
+            key: value for key, value in data.items()
+            if value is not None and value != ""
+        }
+        formatted_data['price'] = price
+        formatted_data['billing_cycle'] = billing_cycle
+        if not formatted_data.get('category'):
+            formatted_data['category'] = '其他'
+
+        return formatted_data
+
     async def query(self, filters: Optional[Dict[str, Any]] = None) -> TaskResult:
         """
         查询订阅记录
@@ -163,38 +240,25 @@ class SubscriptionTask(BaseTask):
         """
         try:
             filter_condition = None
-            sorts = [{"property": "下次计费", "direction": "ascending"}]
+            sorts = list(_SORTS)
             
             if filters:
-                filter_parts = []
-                
-                # 按状态过滤
-                if 'status' in filters:
-                    filter_parts.append({
-                        "property": "状态",
-                        "select": {"equals": filters['status']}
-                    })
-                
-                # 按分类过滤
-                if 'category' in filters:
-                    filter_parts.append({
-                        "property": "分类",
-                        "select": {"equals": filters['category']}
-                    })
-                
-                # 按计费周期过滤
-                if 'billing_cycle' in filters:
-                    filter_parts.append({
-                        "property": "计费周期",
-                        "select": {"equals": filters['billing_cycle']}
-                    })
+                # 每个字段只做一次哈希探测（walrus取值）
+                filter_parts = [
+                    {"property": prop, "select": {"equals": value}}
+                    for key, prop in _SELECT_FIELDS.items()
+                    if (value := filters.get(key)) is not None
+                ]
                 
-                # 即将到期的订阅（7天内）
-                if filters.get('expiring_soon'):
-                    next_week = datetime.now(timezone.utc) + timedelta(days=7)
+                # 即将到期的订阅（expiring_within_days天内，expiring_soon等价7天）
+                expiring_days = filters.get('expiring_within_days')
+                if expiring_days is None and filters.get('expiring_soon'):
+                    expiring_days = 7
+                if expiring_days is not None:
+                    cutoff = datetime.now(timezone.utc) + timedelta(days=expiring_days)
                     filter_parts.append({
                         "property": "下次计费",
-                        "date": {"on_or_before": next_week.isoformat()}
+                        "date": {"on_or_before": cutoff.isoformat()}
                     })
                 
                 # 组合过滤条件
@@ -247,18 +311,38 @@ class SubscriptionTask(BaseTask):
                     message="没有订阅记录需要删除"
                 )
             
-            # 删除所有记录
-            deleted_count = 0
-            failed_count = 0
-            
-            for subscription in all_subscriptions:
-                page_id = subscription.get("id")
-                if page_id:
-                    success = await self.notion_client.delete_page(page_id)
-                    if success:
-                        deleted_count += 1
-                    else:
-                        failed_count += 1
+            page_ids = [
+                subscription["id"]
+                for subscription in all_subscriptions
+                if subscription.get("id")
+            ]
+
+            # 小批量直接顺序删除，省去Task调度开销；大批量用固定工作者池
+            if len(page_ids) < 8:
+                results = [
+                    await self.notion_client.delete_page(page_id)
+                    for page_id in page_ids
+                ]
+            else:
+                queue: asyncio.Queue = asyncio.Queue()
+                for page_id in page_ids:
+                    queue.put_nowait(page_id)
+
+                results = []
+
+                async def _worker():
+                    while not queue.empty():
+                        page_id = queue.get_nowait()
+                        try:
+                            results.append(await self.notion_client.delete_page(page_id))
+                        except Exception:
+                            results.append(False)
+
+                workers = [asyncio.create_task(_worker()) for _ in range(8)]
+                await asyncio.gather(*workers)
+
+            deleted_count = sum(1 for r in results if r is True)
+            failed_count = len(results) - deleted_count
             
             if failed_count == 0:
                 return TaskResult(
@@ -274,7 +358,7 @@ class SubscriptionTask(BaseTask):
                 )
             
         except Exception as e:
-            self.logger.error(f"删除所有订阅记录失败: {e}")
+            logger.error(f"删除所有订阅记录失败: {e}")
             return TaskResult(
                 success=False,
                 error=str(e),
@@ -283,11 +367,11 @@ class SubscriptionTask(BaseTask):
     
     def get_required_fields(self) -> List[str]:
         """获取必填字段"""
-        return ['name', 'price', 'billing_cycle']
+        return self.REQUIRED_FIELDS
     
     def get_optional_fields(self) -> List[str]:
         """获取可选字段"""
-        return ['category', 'description', 'next_billing_date']
+        return self.OPTIONAL_FIELDS
     
     def get_task_description(self) -> str:
         """获取任务描述"""
@@ -297,15 +381,16 @@ class SubscriptionTask(BaseTask):
         """格式化订阅数据"""
         formatted_data = super().format_data(data)
         
-        # 确保价格为浮点数
-        if 'price' in formatted_data:
+        # 确保价格为浮点数（已是float时跳过重复转换）
+        price = formatted_data.get('price')
+        if price is not None and not isinstance(price, float):
             try:
-                formatted_data['price'] = float(formatted_data['price'])
+                formatted_data['price'] = float(price)
             except (ValueError, TypeError):
                 formatted_data['price'] = 0.0
         
         # 确保计费周期有效
-        if 'billing_cycle' not in formatted_data or formatted_data['billing_cycle'] not in ['周', '月', '年']:
+        if 'billing_cycle' not in formatted_data or formatted_data['billing_cycle'] not in self._VALID_CYCLES:
             formatted_data['billing_cycle'] = '月'
         
         # 设置默认分类
@@ -325,8 +410,9 @@ class SubscriptionTask(BaseTask):
             TaskResult: 即将续费的订阅列表
         """
         try:
+            # 截止过滤直接下推到Notion查询，客户端无需再逐行解析日期
             filters = {
-                'expiring_soon': True,
+                'expiring_within_days': days,
                 'status': '活跃'
             }
             
@@ -335,21 +421,7 @@ class SubscriptionTask(BaseTask):
             if not query_result.success:
                 return query_result
             
-            records = query_result.data.get('records', [])
-            
-            # 过滤出真正即将到期的
-            upcoming = []
-            cutoff_date = datetime.now(timezone.utc) + timedelta(days=days)
-            
-            for record in records:
-                next_billing_str = record.get('下次计费')
-                if next_billing_str:
-                    try:
-                        next_billing = datetime.fromisoformat(next_billing_str.replace('Z', '+00:00'))
-                        if next_billing <= cutoff_date:
-                            upcoming.append(record)
-                    except (ValueError, AttributeError):
-                        continue
+            upcoming = query_result.data.get('records', [])
             
             return TaskResult(
                 success=True,
@@ -381,29 +453,20 @@ class SubscriptionTask(BaseTask):
             
             records = query_result.data.get('records', [])
             
-            # 计算月度等价成本
-            monthly_cost = 0.0
-            cost_by_category = {}
-            
-            for record in records:
-                price = record.get('价格', 0) or 0
-                billing_cycle = record.get('计费周期', '月')
-                category = record.get('分类', '其他')
-                
-                # 转换为月度成本
-                if billing_cycle == '周':
-                    monthly_equivalent = price * 4.33  # 一个月约4.33周
-                elif billing_cycle == '年':
-                    monthly_equivalent = price / 12
-                else:  # 月
-                    monthly_equivalent = price
-                
-                monthly_cost += monthly_equivalent
-                
-                # 按分类统计
-                if category not in cost_by_category:
-                    cost_by_category[category] = 0.0
-                cost_by_category[category] += monthly_equivalent
+            # 计算月度等价成本；大记录集用NumPy向量化，小集合留在纯Python
+            if np is not None and len(records) > 256:
+                monthly_cost, cost_by_category = self._aggregate_monthly_np(records)
+            else:
+                monthly_cost = 0.0
+                cost_by_category = defaultdict(float)
+
+                for record in records:
+                    price = record.get('价格', 0.0)
+                    factor = _MONTHLY_FACTOR.get(record.get('计费周期', '月'), 1.0)
+                    monthly_equivalent = price * factor
+
+                    monthly_cost += monthly_equivalent
+                    cost_by_category[record.get('分类', '其他')] += monthly_equivalent
             
             stats = {
                 'total_monthly_cost': round(monthly_cost, 2),
@@ -425,6 +488,38 @@ class SubscriptionTask(BaseTask):
                 message="计算订阅成本失败"
             )
     
+    @staticmethod
+    def _aggregate_monthly_np(records: List[Dict[str, Any]]) -> tuple:
+        """
+        NumPy向量化的月度成本聚合（单次SIMD乘法 + bincount分组）
+
+        Args:
+            records: 订阅记录列表
+
+        Returns:
+            tuple: (月度总成本, 按分类成本dict)
+        """
+        count = len(records)
+        prices = np.fromiter(
+            (record.get('价格', 0.0) for record in records),
+            dtype=np.float64, count=count
+        )
+        factors = np.fromiter(
+            (_MONTHLY_FACTOR.get(record.get('计费周期', '月'), 1.0) for record in records),
+            dtype=np.float64, count=count
+        )
+        monthly = prices * factors
+
+        categories = np.array([record.get('分类', '其他') for record in records])
+        unique_categories, inverse = np.unique(categories, return_inverse=True)
+        sums = np.bincount(inverse, weights=monthly)
+
+        cost_by_category = {
+            category: float(total)
+            for category, total in zip(unique_categories, sums)
+        }
+        return float(monthly.sum()), cost_by_category
+
     async def cancel_subscription(self, subscription_id: str) -> TaskResult:
         """
         取消订阅
@@ -438,7 +533,8 @@ class SubscriptionTask(BaseTask):
         try:
             success = await self.notion_client.update_page(
                 page_id=subscription_id,
-                properties={"状态": "已取消"}
+                properties={"状态": "已取消"},
+                database_name="subscriptions"
             )
             
             if success:
@@ -3,20 +3,226 @@
 处理待办事项的创建和管理
 """
 
+import asyncio
+import difflib
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any, Optional
+from loguru import logger
+
 from .base_task import BaseTask, TaskResult
-from ..storage.notion_client import NotionClient
+from ..ai.gemini_client import GeminiClient
+from ..storage.notion_client import get_notion_client
 from ..config.settings import settings
 
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+_TZ_UTC = timezone.utc
+
+# 校验用的ISO日期格式正则，避免用异常做控制流
+_ISO_DATE_RE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?$'
+)
+
+# query支持的全部过滤键，用于快速判断是否需要构建过滤条件
+_FILTER_KEYS = frozenset((
+    'status', '状态', 'priority', '优先级', 'category', '分类',
+    'due_date', '截止日期', 'due_soon', 'overdue',
+))
+
+# select类型过滤条件表：(英文键, 中文键, Notion属性名)
+_SELECT_FILTERS = (
+    ('status', '状态', '状态'),
+    ('priority', '优先级', '优先级'),
+    ('category', '分类', '分类'),
+)
+
+_VALID_PRIORITIES = frozenset(('高', '中', '低'))
+_PRIORITY_ORDER = {'高': 1, '中': 2, '低': 3}
+
+
+def _priority_sort_key(record: Dict[str, Any]) -> int:
+    """按优先级排序的键函数，未知优先级按中处理"""
+    return _PRIORITY_ORDER.get(record.get('优先级', '中'), 2)
+
+
+# 查询结果TTL缓存：键为过滤条件哈希，值为(写入时间, 结果列表)
+_QUERY_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_QUERY_CACHE_SIZE = 128
+_QUERY_CACHE_TTL = 60.0
+
+# 从AI回复中提取选择结果JSON对象的正则
+_JSON_OBJ_RE = re.compile(r'\{[^{}]*"selected_index"[^{}]*\}', re.DOTALL)
+
+# AI任务选择的提示词模板，模块级构建一次
+_PROMPT_TMPL = """
+你需要从以下候选任务中选择最适合用户更新意图的任务。
+
+用户想要更新的任务名称：{task_name}
+更新内容：
+- 新状态：{new_status}
+- 新优先级：{new_priority}
+- 新截止日期：{new_date}
+
+候选任务列表：
+{candidates}
+
+请分析选择最合适的任务，考虑因素：
+1. 任务标题与用户提到的名称的相似度
+2. 任务的当前状态（例如，不要更新已完成的任务为完成状态）
+3. 任务的优先级和分类
+4. 截止日期的合理性
+
+请以JSON格式返回选择结果：
+{{
+    "selected_index": 选中任务的索引号,
+    "confidence": 0.0-1.0的置信度,
+    "reason": "选择理由"
+}}
+
+如果无法确定最佳选择，请返回 {{"selected_index": -1, "confidence": 0.0, "reason": "无法确定"}}
+"""
+
+# 懒初始化的Gemini客户端，避免每次AI选择都重建
+_gemini_client: Optional[GeminiClient] = None
+
+
+def _get_gemini_client() -> GeminiClient:
+    """获取模块级共享的Gemini客户端实例"""
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = GeminiClient()
+    return _gemini_client
+
+
+def _parse_iso(s: str) -> datetime:
+    """
+    解析ISO格式日期字符串（热路径优化版）
+
+    Args:
+        s: 日期字符串（YYYY-MM-DD 或带时间/时区的ISO格式）
+
+    Returns:
+        datetime: 解析后的日期时间对象
+    """
+    if ciso8601 is not None:
+        return ciso8601.parse_datetime(s)
+    if len(s) == 10:
+        # YYYY-MM-DD
+        return datetime(int(s[:4]), int(s[5:7]), int(s[8:10]), tzinfo=_TZ_UTC)
+    if s.endswith('Z') and len(s) >= 19:
+        # YYYY-MM-DDTHH:MM:SS[.ffffff]Z
+        return datetime(
+            int(s[:4]), int(s[5:7]), int(s[8:10]),
+            int(s[11:13]), int(s[14:16]), int(s[17:19]),
+            tzinfo=_TZ_UTC
+        )
+    return datetime.fromisoformat(s.replace('Z', '+00:00'))
+
+
+def _parse_iso_safe(s: str) -> Optional[datetime]:
+    """解析ISO日期字符串，失败时返回None而不抛异常"""
+    try:
+        return _parse_iso(s)
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+@dataclass(slots=True)
+class TodoRow:
+    """待办记录的紧凑视图，属性访问比字典查找更快"""
+
+    id: str
+    title: str
+    status: str
+    priority: str
+    due_date: str
+    category: str
+    description: str
+    priority_rank: int
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "TodoRow":
+        """从query_database返回的记录字典构建视图"""
+        _get = record.get
+        priority = _get('优先级', '中')
+        return cls(
+            id=_get('id', ''),
+            title=_get('标题', ''),
+            status=_get('状态', ''),
+            priority=priority,
+            due_date=_get('截止日期', ''),
+            category=_get('分类', ''),
+            description=_get('描述', ''),
+            priority_rank=_PRIORITY_ORDER.get(priority, 2),
+            raw=record
+        )
+
 
 class TodoTask(BaseTask):
     """待办事项任务类"""
     
     def __init__(self):
         super().__init__("待办事项")
-        self.notion_client = NotionClient()
-    
+        self.notion_client = get_notion_client()
+
+    async def _cached_query(
+        self,
+        filter_condition: Optional[Dict[str, Any]],
+        sorts: Optional[List[Dict[str, Any]]],
+        limit: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        带TTL缓存的待办查询，相同过滤条件在短时间内复用结果
+
+        Args:
+            filter_condition: Notion过滤条件
+            sorts: 排序条件
+            limit: 结果数量限制
+
+        Returns:
+            List[Dict]: 查询结果列表
+        """
+        key = hashlib.blake2b(
+            json.dumps(
+                ("todos", filter_condition, sorts, limit),
+                sort_keys=True, ensure_ascii=False
+            ).encode()
+        ).hexdigest()
+
+        now = time.monotonic()
+        cached = _QUERY_CACHE.get(key)
+        if cached is not None and now - cached[0] < _QUERY_CACHE_TTL:
+            _QUERY_CACHE.move_to_end(key)
+            return list(cached[1])
+
+        results = await self.notion_client.query_database(
+            database_name="todos",
+            filter_condition=filter_condition,
+            sorts=sorts,
+            limit=limit
+        )
+
+        _QUERY_CACHE[key] = (now, results)
+        _QUERY_CACHE.move_to_end(key)
+        while len(_QUERY_CACHE) > _QUERY_CACHE_SIZE:
+            _QUERY_CACHE.popitem(last=False)
+        return list(results)
+
+    @staticmethod
+    def _invalidate_query_cache() -> None:
+        """写操作后清空查询缓存，避免返回过期结果"""
+        _QUERY_CACHE.clear()
+
     async def execute(self, data: Dict[str, Any]) -> TaskResult:
         """
         执行待办事项任务
@@ -33,12 +239,24 @@ class TodoTask(BaseTask):
             if data.get('due_date'):
                 due_date_str = data.get('due_date')
                 if isinstance(due_date_str, str):
+                    # 正则只校验形状，2024-02-30这类历法非法值在这里才会暴露
                     try:
-                        due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
+                        s = due_date_str
+                        if len(s) == 10 and s[4] == '-' and s[7] == '-':
+                            # 纯日期直接切片构造，跳过完整解析
+                            due_date = datetime(
+                                int(s[:4]), int(s[5:7]), int(s[8:10]), tzinfo=_TZ_UTC
+                            )
+                        else:
+                            due_date = _parse_iso(s)
+                            if due_date.tzinfo is None:
+                                due_date = due_date.replace(tzinfo=_TZ_UTC)
                     except ValueError:
-                        # 尝试解析简单的日期格式
-                        due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-                        due_date = due_date.replace(tzinfo=timezone.utc)
+                        return TaskResult(
+                            success=False,
+                            error="截止日期格式不正确",
+                            message="截止日期格式不正确"
+                        )
             
             # 创建待办事项记录
             page_id = await self.notion_client.add_todo(
@@ -50,6 +268,7 @@ class TodoTask(BaseTask):
             )
             
             if page_id:
+                self._invalidate_query_cache()
                 return TaskResult(
                     success=True,
                     data={
@@ -87,29 +306,22 @@ class TodoTask(BaseTask):
         """
         # 检查必填字段
         if not data.get('title'):
-            self.logger.error("缺少待办事项标题")
+            logger.error("缺少待办事项标题")
             return False
         
         # 检查优先级
         priority = data.get('priority', '中')
-        if priority not in ['高', '中', '低']:
-            self.logger.warning(f"未知的优先级: {priority}，将默认为中")
+        if priority not in _VALID_PRIORITIES:
+            logger.warning(f"未知的优先级: {priority}，将默认为中")
             data['priority'] = '中'
         
-        # 验证截止日期格式
-        if data.get('due_date'):
-            try:
-                due_date_str = data.get('due_date')
-                if isinstance(due_date_str, str):
-                    # 尝试解析日期
-                    try:
-                        datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
-                    except ValueError:
-                        datetime.strptime(due_date_str, '%Y-%m-%d')
-            except (ValueError, TypeError):
-                self.logger.error("截止日期格式不正确")
+        # 验证截止日期格式（正则校验，不做真正的解析）
+        due_date_str = data.get('due_date')
+        if due_date_str and isinstance(due_date_str, str):
+            if not _ISO_DATE_RE.match(due_date_str):
+                logger.error("截止日期格式不正确")
                 return False
-        
+
         return True
     
     async def query(self, filters: Optional[Dict[str, Any]] = None) -> TaskResult:
@@ -126,61 +338,44 @@ class TodoTask(BaseTask):
             filter_condition = None
             sorts = [{"property": "截止日期", "direction": "ascending"}]
             
-            if filters:
+            if filters and not _FILTER_KEYS.isdisjoint(filters):
                 filter_parts = []
                 
-                # 按状态过滤 - 支持中英文字段名
-                status_filter = filters.get('status') or filters.get('状态')
-                if status_filter:
-                    filter_parts.append({
-                        "property": "状态",
-                        "select": {"equals": status_filter}
-                    })
-                
-                # 按优先级过滤 - 支持中英文字段名
-                priority_filter = filters.get('priority') or filters.get('优先级')
-                if priority_filter:
-                    filter_parts.append({
-                        "property": "优先级",
-                        "select": {"equals": priority_filter}
-                    })
-                
-                # 按分类过滤 - 支持中英文字段名
-                category_filter = filters.get('category') or filters.get('分类')
-                if category_filter:
-                    filter_parts.append({
-                        "property": "分类",
-                        "select": {"equals": category_filter}
-                    })
-                
+                # select类型过滤统一走条件表 - 支持中英文字段名
+                for en_key, zh_key, prop in _SELECT_FILTERS:
+                    value = filters.get(en_key) or filters.get(zh_key)
+                    if value:
+                        filter_parts.append({
+                            "property": prop,
+                            "select": {"equals": value}
+                        })
+
+
                 # 按截止日期过滤 - 支持中英文字段名
                 due_date_filter = filters.get('due_date') or filters.get('截止日期')
-                if due_date_filter:
-                    # 确保日期格式正确
-                    if isinstance(due_date_filter, str):
-                        try:
-                            # 如果是日期字符串，转换为ISO格式
-                            if len(due_date_filter) == 10:  # YYYY-MM-DD format
-                                due_date_filter += "T00:00:00.000Z"
-                            
-                            filter_parts.append({
-                                "property": "截止日期",
-                                "date": {"equals": due_date_filter}
-                            })
-                        except Exception as e:
-                            self.logger.warning(f"日期格式解析失败: {due_date_filter}, {e}")
+                if due_date_filter and isinstance(due_date_filter, str):
+                    # 纯字符串拼接转ISO格式，Notion按字典序比较日期无需解析
+                    if len(due_date_filter) == 10:  # YYYY-MM-DD format
+                        due_date_filter += "T00:00:00.000Z"
+
+                    filter_parts.append({
+                        "property": "截止日期",
+                        "date": {"equals": due_date_filter}
+                    })
                 
+                # 当前时间只取一次，两个分支共用
+                now = datetime.now(_TZ_UTC)
+
                 # 即将到期的任务
                 if filters.get('due_soon'):
-                    tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+                    tomorrow = now + timedelta(days=1)
                     filter_parts.append({
                         "property": "截止日期",
                         "date": {"on_or_before": tomorrow.isoformat()}
                     })
-                
-                # 已过期的任务
+
+                # 已过期的任务（已完成/已取消是终态，均不算逾期）
                 if filters.get('overdue'):
-                    now = datetime.now(timezone.utc)
                     filter_parts.append({
                         "and": [
                             {
@@ -190,6 +385,10 @@ class TodoTask(BaseTask):
                             {
                                 "property": "状态",
                                 "select": {"does_not_equal": "已完成"}
+                            },
+                            {
+                                "property": "状态",
+                                "select": {"does_not_equal": "已取消"}
                             }
                         ]
                     })
@@ -200,36 +399,30 @@ class TodoTask(BaseTask):
                 elif len(filter_parts) > 1:
                     filter_condition = {"and": filter_parts}
             
-            self.logger.info(f"执行查询，过滤条件: {filter_condition}")
+            logger.info(f"执行查询，过滤条件: {filter_condition}")
             
             # 执行查询
-            results = await self.notion_client.query_database(
-                database_name="todos",
-                filter_condition=filter_condition,
-                sorts=sorts,
-                limit=filters.get('limit', 20) if filters else 20
+            results = await self._cached_query(
+                filter_condition,
+                sorts,
+                filters.get('limit', 20) if filters else 20
             )
-            
+
             # 如果有过滤条件但没有结果，尝试无过滤条件查询做对比
             if filter_condition and len(results) == 0:
-                self.logger.info("有过滤条件的查询无结果，尝试查询所有记录进行调试")
-                all_results = await self.notion_client.query_database(
-                    database_name="todos",
-                    filter_condition=None,
-                    sorts=sorts,
-                    limit=5
-                )
-                self.logger.info(f"数据库中共有 {len(all_results)} 条待办记录")
+                logger.info("有过滤条件的查询无结果，尝试查询所有记录进行调试")
+                all_results = await self._cached_query(None, sorts, 5)
+                logger.info(f"数据库中共有 {len(all_results)} 条待办记录")
                 
                 # 如果有记录，记录调试信息
                 if all_results:
                     sample_record = all_results[0]
-                    self.logger.info(f"示例记录字段: {list(sample_record.keys())}")
-                    self.logger.info(f"示例记录状态: {sample_record.get('状态')}")
-                    self.logger.info(f"示例记录优先级: {sample_record.get('优先级')}")
-                    self.logger.info(f"示例记录截止日期: {sample_record.get('截止日期')}")
+                    logger.info(f"示例记录字段: {list(sample_record.keys())}")
+                    logger.info(f"示例记录状态: {sample_record.get('状态')}")
+                    logger.info(f"示例记录优先级: {sample_record.get('优先级')}")
+                    logger.info(f"示例记录截止日期: {sample_record.get('截止日期')}")
             
-            self.logger.info(f"查询完成，返回 {len(results)} 条记录")
+            logger.info(f"查询完成，返回 {len(results)} 条记录")
             return TaskResult(
                 success=True,
                 data={"records": results, "count": len(results)},
@@ -237,7 +430,7 @@ class TodoTask(BaseTask):
             )
             
         except Exception as e:
-            self.logger.error(f"查询待办事项失败: {e}")
+            logger.error(f"查询待办事项失败: {e}")
             return TaskResult(
                 success=False,
                 error=str(e),
@@ -252,34 +445,33 @@ class TodoTask(BaseTask):
             TaskResult: 删除结果
         """
         try:
-            # 先查询所有待办事项
-            all_todos = await self.notion_client.query_database(
-                database_name="todos",
-                filter_condition=None,
-                sorts=None,
-                limit=None  # 获取所有记录
-            )
-            
-            if not all_todos:
+            # 流式分页遍历并发删除，信号量限制并发以符合Notion速率限制
+            sem = asyncio.Semaphore(3)
+
+            async def _delete_one(pid: str) -> bool:
+                async with sem:
+                    return await self.notion_client.delete_page(pid)
+
+            pending = []
+            async for todo in self.notion_client.iter_database("todos"):
+                page_id = todo.get("id")
+                if page_id:
+                    pending.append(asyncio.ensure_future(_delete_one(page_id)))
+
+            results = await asyncio.gather(*pending, return_exceptions=True) if pending else []
+            deleted_count = sum(1 for r in results if r is True)
+            failed_count = len(results) - deleted_count
+
+            if deleted_count:
+                self._invalidate_query_cache()
+
+            if deleted_count == 0 and failed_count == 0:
                 return TaskResult(
                     success=True,
                     data={"deleted_count": 0},
                     message="没有待办事项需要删除"
                 )
-            
-            # 删除所有记录
-            deleted_count = 0
-            failed_count = 0
-            
-            for todo in all_todos:
-                page_id = todo.get("id")
-                if page_id:
-                    success = await self.notion_client.delete_page(page_id)
-                    if success:
-                        deleted_count += 1
-                    else:
-                        failed_count += 1
-            
+
             if failed_count == 0:
                 return TaskResult(
                     success=True,
@@ -294,7 +486,7 @@ class TodoTask(BaseTask):
                 )
             
         except Exception as e:
-            self.logger.error(f"删除所有待办事项失败: {e}")
+            logger.error(f"删除所有待办事项失败: {e}")
             return TaskResult(
                 success=False,
                 error=str(e),
@@ -321,29 +513,38 @@ class TodoTask(BaseTask):
             TaskResult: 更新结果
         """
         try:
-            # 先查询匹配的任务
-            all_todos = await self.notion_client.query_database(
-                database_name="todos",
-                filter_condition=None,
-                sorts=None,
-                limit=None
+            # 先用标题contains过滤条件在服务端查询候选任务
+            matched_tasks = await self._cached_query(
+                {
+                    "property": "标题",
+                    "title": {"contains": task_name}
+                },
+                None,
+                25
             )
-            
-            if not all_todos:
-                return TaskResult(
-                    success=False,
-                    error="没有找到任何任务",
-                    message="待办事项列表为空"
-                )
-            
-            # 寻找匹配的任务（支持模糊匹配）
-            matched_tasks = []
-            for todo in all_todos:
-                title = todo.get("标题", "").lower()
-                if task_name.lower() in title or title in task_name.lower():
-                    matched_tasks.append(todo)
-            
-            self.logger.info(f"找到 {len(matched_tasks)} 个匹配「{task_name}」的任务")
+
+            if not matched_tasks:
+                # 服务端无命中时回退流式扫描，兼容标题为用户输入子串的情况；
+                # 命中足够多候选即提前终止，避免物化整个数据库
+                task_name_lower = task_name.lower()
+                append = matched_tasks.append
+                scanned = 0
+                async for todo in self.notion_client.iter_database("todos"):
+                    scanned += 1
+                    title = todo.get("标题", "").lower()
+                    if task_name_lower in title or title in task_name_lower:
+                        append(todo)
+                        if len(matched_tasks) >= 25:
+                            break
+
+                if scanned == 0:
+                    return TaskResult(
+                        success=False,
+                        error="没有找到任何任务",
+                        message="待办事项列表为空"
+                    )
+
+            logger.info(f"找到 {len(matched_tasks)} 个匹配「{task_name}」的任务")
             
             if not matched_tasks:
                 return TaskResult(
@@ -352,34 +553,51 @@ class TodoTask(BaseTask):
                     message=f"未找到名称包含「{task_name}」的任务"
                 )
             
+            # 在边界处一次性转换为紧凑视图，后续循环走属性访问
+            matched_rows = [TodoRow.from_record(t) for t in matched_tasks]
+
             # 选择最佳匹配任务
             best_match = None
-            if len(matched_tasks) == 1:
-                best_match = matched_tasks[0]
-                self.logger.info(f"找到唯一匹配任务: {best_match.get('标题')}")
+            if len(matched_rows) == 1:
+                best_match = matched_rows[0]
+                logger.info(f"找到唯一匹配任务: {best_match.title}")
             else:
-                # 多个匹配时，使用AI智能选择
-                self.logger.info(f"找到多个匹配任务，使用AI选择最佳匹配")
-                best_match = await self._select_best_match_with_ai(
-                    task_name, matched_tasks, new_status, new_priority, new_date
-                )
-                
+                # 先找标题完全一致的唯一候选，命中则跳过AI往返
+                task_name_norm = task_name.strip().lower()
+                exact_matches = [
+                    row for row in matched_rows
+                    if row.title.strip().lower() == task_name_norm
+                ]
+                # 更新为已完成时，已完成的任务是无效目标，排除后再判断唯一性
+                if new_status == '已完成' and len(exact_matches) > 1:
+                    pending = [row for row in exact_matches if row.status != '已完成']
+                    if pending:
+                        exact_matches = pending
+
+                if len(exact_matches) == 1:
+                    best_match = exact_matches[0]
+                    logger.info(f"标题完全匹配，跳过AI选择: {best_match.title}")
+                else:
+                    # 多个匹配时，使用AI智能选择
+                    logger.info(f"找到多个匹配任务，使用AI选择最佳匹配")
+                    best_match = await self._select_best_match_with_ai(
+                        task_name, matched_rows, new_status, new_priority, new_date
+                    )
+
                 if not best_match:
                     # AI选择失败，提供任务列表让用户确认
-                    task_list = []
-                    for i, task in enumerate(matched_tasks, 1):
-                        title = task.get("标题", "")
-                        status = task.get("状态", "")
-                        due_date = task.get("截止日期", "")
-                        task_list.append(f"{i}. {title} ({status}, 截止: {due_date})")
-                    
+                    task_list = [
+                        f"{i}. {row.title} ({row.status}, 截止: {row.due_date})"
+                        for i, row in enumerate(matched_rows, 1)
+                    ]
+
                     return TaskResult(
                         success=False,
                         error="多个匹配任务",
                         message=f"找到多个包含「{task_name}」的任务，请明确指定：\n" + "\n".join(task_list)
                     )
-            
-            page_id = best_match.get("id")
+
+            page_id = best_match.id
             if not page_id:
                 return TaskResult(
                     success=False,
@@ -410,7 +628,7 @@ class TodoTask(BaseTask):
                             "date": {"start": new_date}
                         }
                 except Exception as e:
-                    self.logger.warning(f"日期格式解析失败: {new_date}, {e}")
+                    logger.warning(f"日期格式解析失败: {new_date}, {e}")
             
             if not update_data:
                 return TaskResult(
@@ -420,11 +638,12 @@ class TodoTask(BaseTask):
                 )
             
             # 执行更新
-            self.logger.info(f"更新任务 {best_match.get('标题')} (ID: {page_id})")
-            success = await self.notion_client.update_page(page_id, update_data)
-            
+            logger.info(f"更新任务 {best_match.title} (ID: {page_id})")
+            success = await self.notion_client.update_page(page_id, update_data, database_name="todos")
+
             if success:
-                task_title = best_match.get("标题", task_name)
+                self._invalidate_query_cache()
+                task_title = best_match.title or task_name
                 update_info = []
                 if new_status:
                     update_info.append(f"状态: {new_status}")
@@ -450,7 +669,7 @@ class TodoTask(BaseTask):
                 )
             
         except Exception as e:
-            self.logger.error(f"更新待办事项失败: {e}")
+            logger.error(f"更新待办事项失败: {e}")
             return TaskResult(
                 success=False,
                 error=str(e),
@@ -458,105 +677,89 @@ class TodoTask(BaseTask):
             )
     
     async def _select_best_match_with_ai(
-        self, 
-        task_name: str, 
-        matched_tasks: List[Dict], 
-        new_status: str = "", 
-        new_priority: str = "", 
+        self,
+        task_name: str,
+        matched_tasks: List[TodoRow],
+        new_status: str = "",
+        new_priority: str = "",
         new_date: str = ""
-    ) -> Optional[Dict]:
+    ) -> Optional[TodoRow]:
         """
         使用AI智能选择最佳匹配的任务
-        
+
         Args:
             task_name: 用户提到的任务名称
-            matched_tasks: 匹配的任务列表
+            matched_tasks: 匹配的任务视图列表
             new_status: 要设置的新状态
             new_priority: 要设置的新优先级
             new_date: 要设置的新日期
-            
+
         Returns:
-            Optional[Dict]: 最佳匹配的任务，如果无法确定则返回None
+            Optional[TodoRow]: 最佳匹配的任务，如果无法确定则返回None
         """
         try:
-            # 构建候选任务信息
-            candidates_info = []
-            for i, task in enumerate(matched_tasks):
-                task_info = {
+            # 候选过多时按标题相似度取前8个，限制提示词长度
+            if len(matched_tasks) > 8:
+                task_name_norm = task_name.strip().lower()
+                matched_tasks = sorted(
+                    matched_tasks,
+                    key=lambda row: difflib.SequenceMatcher(
+                        None, task_name_norm, row.title.strip().lower()
+                    ).ratio(),
+                    reverse=True
+                )[:8]
+
+            # 只序列化选择所需的字段，标题截断到80字符
+            candidates_info = [
+                {
                     "index": i,
-                    "title": task.get("标题", ""),
-                    "status": task.get("状态", ""),
-                    "priority": task.get("优先级", ""),
-                    "due_date": task.get("截止日期", ""),
-                    "category": task.get("分类", ""),
-                    "description": task.get("描述", "")
+                    "title": row.title[:80],
+                    "status": row.status,
+                    "priority": row.priority,
+                    "due_date": row.due_date
                 }
-                candidates_info.append(task_info)
-            
-            prompt = f"""
-你需要从以下候选任务中选择最适合用户更新意图的任务。
-
-用户想要更新的任务名称：{task_name}
-更新内容：
-- 新状态：{new_status if new_status else '无'}
-- 新优先级：{new_priority if new_priority else '无'}
-- 新截止日期：{new_date if new_date else '无'}
+                for i, row in enumerate(matched_tasks)
+            ]
+            
+            prompt = _PROMPT_TMPL.format(
+                task_name=task_name,
+                new_status=new_status or '无',
+                new_priority=new_priority or '无',
+                new_date=new_date or '无',
+                candidates=json.dumps(
+                    candidates_info, ensure_ascii=False, separators=(',', ':')
+                )
+            )
 
-候选任务列表：
-{json.dumps(candidates_info, ensure_ascii=False, indent=2)}
+            gemini_client = _get_gemini_client()
 
-请分析选择最合适的任务，考虑因素：
-1. 任务标题与用户提到的名称的相似度
-2. 任务的当前状态（例如，不要更新已完成的任务为完成状态）
-3. 任务的优先级和分类
-4. 截止日期的合理性
-
-请以JSON格式返回选择结果：
-{{
-    "selected_index": 选中任务的索引号,
-    "confidence": 0.0-1.0的置信度,
-    "reason": "选择理由"
-}}
-
-如果无法确定最佳选择，请返回 {{"selected_index": -1, "confidence": 0.0, "reason": "无法确定"}}
-"""
-            
-            # 导入必要的模块
-            from ..ai.gemini_client import GeminiClient
-            import asyncio
-            import json
-            
-            gemini_client = GeminiClient()
-            
             response = await asyncio.to_thread(
                 gemini_client.model.generate_content,
                 prompt
             )
-            
+
             response_text = response.text.strip()
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                result = json.loads(json_str)
-                
+            match = _JSON_OBJ_RE.search(response_text)
+
+            if match:
+                result = json.loads(match.group(0))
+
                 selected_index = result.get("selected_index", -1)
                 confidence = result.get("confidence", 0.0)
                 reason = result.get("reason", "")
                 
-                self.logger.info(f"AI选择结果: index={selected_index}, confidence={confidence}, reason={reason}")
+                logger.info(f"AI选择结果: index={selected_index}, confidence={confidence}, reason={reason}")
                 
                 if selected_index >= 0 and selected_index < len(matched_tasks) and confidence >= 0.7:
                     selected_task = matched_tasks[selected_index]
-                    self.logger.info(f"AI选择任务: {selected_task.get('标题')} (置信度: {confidence})")
+                    logger.info(f"AI选择任务: {selected_task.title} (置信度: {confidence})")
                     return selected_task
                 else:
-                    self.logger.warning(f"AI选择置信度不足或索引无效: {selected_index}, {confidence}")
+                    logger.warning(f"AI选择置信度不足或索引无效: {selected_index}, {confidence}")
                     return None
             
         except Exception as e:
-            self.logger.error(f"AI任务选择失败: {e}")
+            logger.error(f"AI任务选择失败: {e}")
             return None
         
         return None
@@ -578,7 +781,7 @@ class TodoTask(BaseTask):
         formatted_data = super().format_data(data)
         
         # 确保优先级有效
-        if 'priority' not in formatted_data or formatted_data['priority'] not in ['高', '中', '低']:
+        if 'priority' not in formatted_data or formatted_data['priority'] not in _VALID_PRIORITIES:
             formatted_data['priority'] = '中'
         
         # 设置默认分类
@@ -600,10 +803,12 @@ class TodoTask(BaseTask):
         try:
             success = await self.notion_client.update_page(
                 page_id=todo_id,
-                properties={"状态": "已完成"}
+                properties={"状态": "已完成"},
+                database_name="todos"
             )
             
             if success:
+                self._invalidate_query_cache()
                 return TaskResult(
                     success=True,
                     data={"todo_id": todo_id},
@@ -631,40 +836,56 @@ class TodoTask(BaseTask):
             TaskResult: 今日待办事项列表
         """
         try:
-            today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            today = datetime.now(_TZ_UTC).replace(hour=0, minute=0, second=0, microsecond=0)
             tomorrow = today + timedelta(days=1)
-            
-            filters = {
-                'status': '待完成'
+
+            # 将日期条件下推到Notion查询，只取今日及之前到期的未完成任务
+            # 已完成和已取消都是终态（见scheduler._DONE_STATUSES），需一并排除
+            filter_condition = {
+                "and": [
+                    {
+                        "property": "状态",
+                        "select": {"does_not_equal": "已完成"}
+                    },
+                    {
+                        "property": "状态",
+                        "select": {"does_not_equal": "已取消"}
+                    },
+                    {
+                        "property": "截止日期",
+                        "date": {"on_or_before": tomorrow.isoformat()}
+                    }
+                ]
             }
-            
-            query_result = await self.query(filters)
-            
-            if not query_result.success:
-                return query_result
-            
-            all_records = query_result.data.get('records', [])
-            
-            # 过滤出今日到期或逾期的任务
-            today_todos = []
-            overdue_todos = []
-            
-            for record in all_records:
-                due_date_str = record.get('截止日期')
-                if due_date_str:
-                    try:
-                        due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
-                        if due_date.date() == today.date():
-                            today_todos.append(record)
-                        elif due_date < today:
-                            overdue_todos.append(record)
-                    except (ValueError, AttributeError):
-                        continue
-            
-            # 按优先级排序
-            priority_order = {'高': 1, '中': 2, '低': 3}
-            today_todos.sort(key=lambda x: priority_order.get(x.get('优先级', '中'), 2))
-            overdue_todos.sort(key=lambda x: priority_order.get(x.get('优先级', '中'), 2))
+
+            all_records = await self._cached_query(
+                filter_condition,
+                [{"property": "截止日期", "direction": "ascending"}],
+                None
+            )
+
+            # 先用推导式一次性解析日期，再按优先级分桶
+            today_date = today.date()
+            parsed = [
+                (record, due_date)
+                for record in all_records
+                if (due_date_str := record.get('截止日期'))
+                and (due_date := _parse_iso_safe(due_date_str)) is not None
+            ]
+
+            today_buckets = ([], [], [])
+            overdue_buckets = ([], [], [])
+            order_get = _PRIORITY_ORDER.get
+
+            for record, due_date in parsed:
+                bucket = order_get(record.get('优先级', '中'), 2) - 1
+                if due_date.date() == today_date:
+                    today_buckets[bucket].append(record)
+                elif due_date < today:
+                    overdue_buckets[bucket].append(record)
+
+            today_todos = today_buckets[0] + today_buckets[1] + today_buckets[2]
+            overdue_todos = overdue_buckets[0] + overdue_buckets[1] + overdue_buckets[2]
             
             return TaskResult(
                 success=True,
@@ -721,7 +942,7 @@ class TodoTask(BaseTask):
             TaskResult: 操作结果
         """
         try:
-            if new_priority not in ['高', '中', '低']:
+            if new_priority not in _VALID_PRIORITIES:
                 return TaskResult(
                     success=False,
                     error="无效的优先级",
@@ -730,10 +951,12 @@ class TodoTask(BaseTask):
             
             success = await self.notion_client.update_page(
                 page_id=todo_id,
-                properties={"优先级": new_priority}
+                properties={"优先级": new_priority},
+                database_name="todos"
             )
             
             if success:
+                self._invalidate_query_cache()
                 return TaskResult(
                     success=True,
                     data={"todo_id": todo_id, "new_priority": new_priority},